@@ -1,17 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field
 from utils.firebase_utils import get_firestore_client
-from typing import List, Optional
-from datetime import datetime
+from utils.repository import Repository, run_blocking
+from utils.session import get_user_id
+from utils import fast_json
+from utils.http_cache import collection_etag
+from utils.list_query import MAX_PAGE_SIZE, parse_fields, build_list_query, project, list_response
+from utils.bulk import import_rows, export_response
+from utils.price_index import price_index
+from utils import catalog
+from cocktails import propagate_price_changes
+from typing import List, Optional, Literal, Dict
+from datetime import datetime, timedelta
 import uuid
 
 router = APIRouter()
 
+alcohol_repo = Repository('alcohol_items', 'Item')
+
 class AlcoholItemCreate(BaseModel):
     name: str
     brand: str
     type: str
-    size: int
+    size: int = Field(gt=0)  # ml
     alcohol_percentage: float
     price: float
     shop: str
@@ -33,48 +44,41 @@ class AlcoholItemResponse(BaseModel):
     image_url: Optional[str] = None
     last_updated: datetime
 
+class CheapestItem(BaseModel):
+    id: str
+    name: str
+    brand: str
+    type: str
+    shop: str
+    price: float
+    size: int
+    alcohol_percentage: float
+    price_per_liter: float
+    price_per_standard_drink: Optional[float] = None
+    product_url: Optional[str] = None
+
 def calculate_price_per_liter(price: float, size_ml: int) -> float:
     """Calculate price per liter"""
     return (price / size_ml) * 1000
 
-@router.get("/", response_model=List[AlcoholItemResponse])
-async def get_alcohol_items(user_id: str):
-    """Get all alcohol items for a user"""
-    db = get_firestore_client()
-    
-    items_ref = db.collection('alcohol_items')
-    items_query = items_ref.where('userId', '==', user_id).get()
-    
-    items = []
-    for doc in items_query:
-        data = doc.to_dict()
-        items.append(AlcoholItemResponse(
-            id=doc.id,
-            user_id=data['userId'],
-            name=data['name'],
-            brand=data['brand'],
-            type=data['type'],
-            size=data['size'],
-            alcohol_percentage=data['alcoholPercentage'],
-            price=data['price'],
-            price_per_liter=data['pricePerLiter'],
-            shop=data['shop'],
-            product_url=data.get('productUrl'),
-            image_url=data.get('imageUrl'),
-            last_updated=data['lastUpdated']
-        ))
-    
-    return items
+ALCOHOL_ITEM_FIELDS = {
+    'user_id': 'userId',
+    'name': 'name',
+    'brand': 'brand',
+    'type': 'type',
+    'size': 'size',
+    'alcohol_percentage': 'alcoholPercentage',
+    'price': 'price',
+    'price_per_liter': 'pricePerLiter',
+    'shop': 'shop',
+    'product_url': 'productUrl',
+    'image_url': 'imageUrl',
+    'last_updated': 'lastUpdated'
+}
 
-@router.post("/", response_model=AlcoholItemResponse)
-async def create_alcohol_item(user_id: str, item_data: AlcoholItemCreate):
-    """Create a new alcohol item"""
-    db = get_firestore_client()
-    
-    item_id = str(uuid.uuid4())
-    price_per_liter = calculate_price_per_liter(item_data.price, item_data.size)
-    
-    item_doc = {
+def build_alcohol_item_doc(item_id: str, user_id: str, item_data: AlcoholItemCreate, now: datetime) -> dict:
+    """Build the stored document for a new alcohol item"""
+    return {
         'id': item_id,
         'userId': user_id,
         'name': item_data.name,
@@ -83,14 +87,71 @@ async def create_alcohol_item(user_id: str, item_data: AlcoholItemCreate):
         'size': item_data.size,
         'alcoholPercentage': item_data.alcohol_percentage,
         'price': item_data.price,
-        'pricePerLiter': price_per_liter,
+        'pricePerLiter': calculate_price_per_liter(item_data.price, item_data.size),
         'shop': item_data.shop,
         'productUrl': item_data.product_url,
+        'catalogId': catalog.catalog_id(item_data.product_url),
         'imageUrl': item_data.image_url,
-        'lastUpdated': datetime.utcnow()
+        'lastUpdated': now
     }
+
+def to_alcohol_item_response(doc_id: str, data: dict) -> AlcoholItemResponse:
+    """Build a response from a stored document"""
+    return AlcoholItemResponse(
+        id=doc_id,
+        user_id=data['userId'],
+        name=data['name'],
+        brand=data['brand'],
+        type=data['type'],
+        size=data['size'],
+        alcohol_percentage=data['alcoholPercentage'],
+        price=data['price'],
+        price_per_liter=data['pricePerLiter'],
+        shop=data['shop'],
+        product_url=data.get('productUrl'),
+        image_url=data.get('imageUrl'),
+        last_updated=data['lastUpdated']
+    )
+
+fast_alcohol_item = fast_json.serializer(
+    ALCOHOL_ITEM_FIELDS,
+    floats=('alcohol_percentage', 'price', 'price_per_liter')
+)
+
+@router.get("/", response_model=List[AlcoholItemResponse])
+async def get_alcohol_items(
+    user_id: str = Depends(get_user_id),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal['json', 'ndjson'] = 'json',
+    cache_headers: Dict[str, str] = Depends(collection_etag('alcohol_items'))
+):
+    """Get all alcohol items for a user"""
+    if limit is None and cursor is None and fields is None and format == 'json':
+        docs = await alcohol_repo.list_for_user(user_id)
+        if fast_json.FAST_RESPONSES:
+            return fast_json.fast_list_response(docs, fast_alcohol_item, cache_headers)
+        return [to_alcohol_item_response(doc_id, data) for doc_id, data in docs]
     
-    db.collection('alcohol_items').document(item_id).set(item_doc)
+    # Paged, projected or streamed listings go straight to Firestore
+    selected = parse_fields(fields, ALCOHOL_ITEM_FIELDS)
+    db = get_firestore_client()
+    query = build_list_query(db, 'alcohol_items', user_id, limit, cursor, selected, ALCOHOL_ITEM_FIELDS)
+    full = fast_alcohol_item if fast_json.FAST_RESPONSES else to_alcohol_item_response
+    serialize = full if selected is None else project(selected, ALCOHOL_ITEM_FIELDS)
+    return await run_blocking(list_response, query, serialize, limit, stream=format == 'ndjson', headers=cache_headers)
+
+@router.post("/", response_model=AlcoholItemResponse)
+async def create_alcohol_item(item_data: AlcoholItemCreate, user_id: str = Depends(get_user_id)):
+    """Create a new alcohol item"""
+    item_id = str(uuid.uuid4())
+    item_doc = build_alcohol_item_doc(item_id, user_id, item_data, datetime.utcnow())
+    price_per_liter = item_doc['pricePerLiter']
+    
+    await alcohol_repo.create(item_id, user_id, item_doc)
+    if item_data.product_url:
+        await run_blocking(catalog.register, get_firestore_client(), item_data.product_url)
     
     return AlcoholItemResponse(
         id=item_id,
@@ -108,20 +169,34 @@ async def create_alcohol_item(user_id: str, item_data: AlcoholItemCreate):
         last_updated=datetime.utcnow()
     )
 
-@router.put("/{item_id}", response_model=AlcoholItemResponse)
-async def update_alcohol_item(item_id: str, user_id: str, item_data: AlcoholItemCreate):
-    """Update an alcohol item"""
+@router.post("/import")
+async def import_alcohol_items(request: Request, format: Literal['csv', 'ndjson'] = 'csv', user_id: str = Depends(get_user_id)):
+    """Create alcohol items from a streamed CSV (with a header row) or NDJSON body"""
     db = get_firestore_client()
+    now = datetime.utcnow()
     
-    item_ref = db.collection('alcohol_items').document(item_id)
-    item_doc = item_ref.get()
-    
-    if not item_doc.exists:
-        raise HTTPException(status_code=404, detail="Item not found")
+    def write_row(writer, item_id: str, item_data: AlcoholItemCreate) -> dict:
+        item_doc = build_alcohol_item_doc(item_id, user_id, item_data, now)
+        writer.set(item_id, alcohol_repo.ref(item_id), item_doc)
+        if item_data.product_url:
+            catalog.register_in_batch(writer, item_id, db, item_data.product_url)
+        return item_doc
     
-    existing_data = item_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    return await import_rows(
+        request.stream(), format, AlcoholItemCreate, write_row, db, 'alcohol_items', user_id,
+        lambda: str(uuid.uuid4())
+    )
+
+@router.get("/export")
+async def export_alcohol_items(format: Literal['csv', 'ndjson'] = 'csv', user_id: str = Depends(get_user_id)):
+    """Stream all of a user's alcohol items as CSV or NDJSON"""
+    query = build_list_query(get_firestore_client(), 'alcohol_items', user_id, None, None, None, ALCOHOL_ITEM_FIELDS)
+    return export_response(query, ALCOHOL_ITEM_FIELDS, format, 'alcohol-items')
+
+@router.put("/{item_id}", response_model=AlcoholItemResponse)
+async def update_alcohol_item(item_id: str, item_data: AlcoholItemCreate, user_id: str = Depends(get_user_id)):
+    """Update an alcohol item"""
+    existing_data = await alcohol_repo.get_owned(item_id, user_id)
     
     price_per_liter = calculate_price_per_liter(item_data.price, item_data.size)
     
@@ -135,32 +210,71 @@ async def update_alcohol_item(item_id: str, user_id: str, item_data: AlcoholItem
         'pricePerLiter': price_per_liter,
         'shop': item_data.shop,
         'productUrl': item_data.product_url,
+        'catalogId': catalog.catalog_id(item_data.product_url),
         'imageUrl': item_data.image_url,
         'lastUpdated': datetime.utcnow()
     }
     
-    item_ref.update(updated_doc)
+    merged_doc = await alcohol_repo.update(item_id, user_id, existing_data, updated_doc)
+    if item_data.product_url and updated_doc['catalogId'] != existing_data.get('catalogId'):
+        await run_blocking(catalog.register, get_firestore_client(), item_data.product_url)
     
-    return AlcoholItemResponse(
-        id=item_id,
-        user_id=user_id,
-        **updated_doc
-    )
+    # Re-cost the cocktails that use this item, by the change in price per ml
+    old_price_per_liter = existing_data.get('pricePerLiter')
+    if old_price_per_liter and price_per_liter != old_price_per_liter:
+        await run_blocking(propagate_price_changes, get_firestore_client(), user_id, {
+            item_id: price_per_liter / old_price_per_liter
+        })
+    
+    return to_alcohol_item_response(item_id, merged_doc)
 
 @router.delete("/{item_id}")
-async def delete_alcohol_item(item_id: str, user_id: str):
+async def delete_alcohol_item(item_id: str, user_id: str = Depends(get_user_id)):
     """Delete an alcohol item"""
-    db = get_firestore_client()
+    await alcohol_repo.get_owned(item_id, user_id)
+    await alcohol_repo.delete(item_id, user_id)
+    return {"message": "Item deleted successfully"}
+
+@router.get("/{item_id}/price-history")
+async def get_price_history(
+    item_id: str,
+    user_id: str = Depends(get_user_id),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Literal['day', 'week', 'month'] = 'day'
+):
+    """Get min/max/avg/last price per day, week or month for an alcohol item"""
+    # numpy loads on first use, keeping it out of cold starts
+    from utils.price_series import load_series, aggregate, to_naive_utc
     
-    item_ref = db.collection('alcohol_items').document(item_id)
-    item_doc = item_ref.get()
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=365)
     
-    if not item_doc.exists:
-        raise HTTPException(status_code=404, detail="Item not found")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
     
-    existing_data = item_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    db = get_firestore_client()
+    timestamps, prices = await run_blocking(load_series, db, item_id, user_id, start, end)
     
-    item_ref.delete()
-    return {"message": "Item deleted successfully"}
\ No newline at end of file
+    return {
+        'item_id': item_id,
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'buckets': aggregate(timestamps, prices, bucket)
+    }
+
+@router.get("/cheapest", response_model=List[CheapestItem])
+async def get_cheapest_items(
+    user_id: str = Depends(get_user_id),
+    by: Literal['price_per_liter', 'price_per_standard_drink'] = 'price_per_liter',
+    k: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    type: Optional[str] = None,
+    brand: Optional[str] = None,
+    shop: Optional[str] = None,
+    cache_headers: Dict[str, str] = Depends(collection_etag('alcohol_items'))
+):
+    """Get the k cheapest alcohol items by price per liter or per standard drink"""
+    # Building a user's index on first use reads their items
+    index = await run_blocking(price_index.get, user_id)
+    return index.top_k(by, k, type=type, brand=brand, shop=shop)
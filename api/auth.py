@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from utils.firebase_utils import get_firestore_client
-import hashlib
+from utils.repository import run_blocking
+from utils.session import hash_password, verify_password, needs_rehash, issue_token
 import uuid
 from datetime import datetime
 
@@ -23,9 +25,9 @@ class UserResponse(BaseModel):
     first_name: str
     last_name: str
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+class LoginResponse(UserResponse):
+    token: str
+    expires_at: int
 
 @router.post("/register", response_model=UserResponse)
 async def register_user(user_data: UserRegistration):
@@ -34,7 +36,7 @@ async def register_user(user_data: UserRegistration):
     
     # Check if user already exists
     users_ref = db.collection('users')
-    existing_user = users_ref.where('email', '==', user_data.email).limit(1).get()
+    existing_user = await run_blocking(users_ref.where('email', '==', user_data.email).limit(1).get)
     
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
@@ -50,15 +52,15 @@ async def register_user(user_data: UserRegistration):
     }
     
     # Store user
-    users_ref.document(user_id).set(user_doc)
+    await run_blocking(users_ref.document(user_id).set, user_doc)
     
     # Store password separately
     password_doc = {
         'userId': user_id,
-        'passwordHash': hash_password(user_data.password),
+        'passwordHash': await run_in_threadpool(hash_password, user_data.password),
         'createdAt': datetime.utcnow()
     }
-    db.collection('user_passwords').document(user_id).set(password_doc)
+    await run_blocking(db.collection('user_passwords').document(user_id).set, password_doc)
     
     return UserResponse(
         id=user_id,
@@ -67,14 +69,14 @@ async def register_user(user_data: UserRegistration):
         last_name=user_data.last_name
     )
 
-@router.post("/login", response_model=UserResponse)
+@router.post("/login", response_model=LoginResponse)
 async def login_user(login_data: UserLogin):
     """Login user"""
     db = get_firestore_client()
     
     # Find user
     users_ref = db.collection('users')
-    user_query = users_ref.where('email', '==', login_data.email).limit(1).get()
+    user_query = await run_blocking(users_ref.where('email', '==', login_data.email).limit(1).get)
     
     if not user_query:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -84,18 +86,27 @@ async def login_user(login_data: UserLogin):
     
     # Check password
     password_ref = db.collection('user_passwords').document(user_id)
-    password_doc = password_ref.get()
+    password_doc = await run_blocking(password_ref.get)
     
     if not password_doc.exists:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    password_data = password_doc.to_dict()
-    if password_data['passwordHash'] != hash_password(login_data.password):
+    # PBKDF2 takes tens of milliseconds, so keep it off the event loop
+    password_hash = password_doc.to_dict()['passwordHash']
+    if not await run_in_threadpool(verify_password, login_data.password, password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    return UserResponse(
+    # Upgrade legacy unsalted hashes now that we know the password
+    if needs_rehash(password_hash):
+        new_hash = await run_in_threadpool(hash_password, login_data.password)
+        await run_blocking(password_ref.update, {'passwordHash': new_hash})
+    
+    token, expires_at = issue_token(user_id)
+    return LoginResponse(
         id=user_id,
         email=user_doc['email'],
         first_name=user_doc['firstName'],
-        last_name=user_doc['lastName']
+        last_name=user_doc['lastName'],
+        token=token,
+        expires_at=expires_at
     )
\ No newline at end of file
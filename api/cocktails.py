@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from utils.firebase_utils import get_firestore_client
-from typing import List, Optional
+from utils.list_cache import get_user_documents
+from utils.write_events import notify_write
+from utils.repository import Repository, run_blocking
+from utils.session import get_user_id
+from utils import fast_json
+from utils.http_cache import collection_etag
+from utils.list_query import MAX_PAGE_SIZE, parse_fields, build_list_query, project, list_response
+from utils.firestore_batch import BatchWriter
+from typing import List, Optional, Literal, Dict, Set
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+cocktail_repo = Repository('cocktails', 'Cocktail')
+
 class CocktailIngredient(BaseModel):
     ingredient_id: str
     ingredient_name: str
@@ -43,6 +53,24 @@ class CocktailResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class WhatIfRequest(BaseModel):
+    ingredient_changes: Dict[str, float] = {}  # ingredient/alcohol item id -> % change
+    type_changes: Dict[str, float] = {}  # alcohol type or ingredient type/category -> % change
+
+class WhatIfCocktail(BaseModel):
+    id: str
+    name: str
+    total_cost: float
+    new_total_cost: float
+    cost_per_serving: float
+    new_cost_per_serving: float
+    selling_price: float
+    new_selling_price: float
+
+class WhatIfResponse(BaseModel):
+    cocktails: List[WhatIfCocktail]
+    total_cost_change: float
+
 def calculate_cocktail_costs(ingredients: List[CocktailIngredient], profit_margin: float, servings: int):
     """Calculate cocktail costs"""
     total_cost = sum(ingredient.cost for ingredient in ingredients)
@@ -55,42 +83,162 @@ def calculate_cocktail_costs(ingredients: List[CocktailIngredient], profit_margi
         'selling_price': selling_price
     }
 
+# Reverse index: ingredient/alcohol item id -> ids of the cocktails using it
+USAGE_COLLECTION = 'ingredient_usage'
+
+def usage_doc_id(user_id: str, ingredient_id: str) -> str:
+    """Reverse index document id, per user so other users' cocktails naming the same id can't claim it"""
+    return f"{user_id}_{ingredient_id}"
+
+def get_ingredient_ids(ingredients: List[dict]) -> Set[str]:
+    return {ingredient['ingredient_id'] for ingredient in ingredients}
+
+def update_ingredient_usage(db, batch, user_id: str, cocktail_id: str, old_ids: Set[str], new_ids: Set[str]):
+    """Add a cocktail's ingredient changes to the reverse index, in the cocktail's batch"""
+    from google.cloud.firestore_v1 import ArrayUnion, ArrayRemove
+    
+    usage_ref = db.collection(USAGE_COLLECTION)
+    for ingredient_id in new_ids - old_ids:
+        batch.set(usage_ref.document(usage_doc_id(user_id, ingredient_id)), {
+            'userId': user_id,
+            'cocktailIds': ArrayUnion([cocktail_id])
+        }, merge=True)
+    for ingredient_id in old_ids - new_ids:
+        batch.set(usage_ref.document(usage_doc_id(user_id, ingredient_id)), {
+            'userId': user_id,
+            'cocktailIds': ArrayRemove([cocktail_id])
+        }, merge=True)
+
+def propagate_price_changes(db, user_id: str, price_ratios: Dict[str, float]) -> int:
+    """Recompute the costs of cocktails using ingredients whose unit price changed
+
+    price_ratios maps an ingredient or alcohol item id to new/old unit price;
+    each affected ingredient cost is scaled by it, so whatever unit
+    conversion went into the original cost is preserved. Only cocktails
+    listed in the reverse index are read. Returns the number updated.
+    """
+    if not price_ratios:
+        return 0
+    
+    usage_refs = [
+        db.collection(USAGE_COLLECTION).document(usage_doc_id(user_id, ingredient_id)) for ingredient_id in price_ratios
+    ]
+    cocktail_ids = set()
+    for usage in db.get_all(usage_refs):
+        if usage.exists and usage.get('userId') == user_id:
+            cocktail_ids.update(usage.get('cocktailIds') or [])
+    
+    if not cocktail_ids:
+        return 0
+    
+    writer = BatchWriter(db)
+    merged_docs = {}
+    now = datetime.utcnow()
+    cocktail_refs = [db.collection('cocktails').document(cocktail_id) for cocktail_id in cocktail_ids]
+    for cocktail_doc in db.get_all(cocktail_refs):
+        if not cocktail_doc.exists:
+            continue
+        data = cocktail_doc.to_dict()
+        if data['userId'] != user_id:
+            continue
+        
+        ingredients = [CocktailIngredient(**ingredient) for ingredient in data['ingredients']]
+        for ingredient in ingredients:
+            ratio = price_ratios.get(ingredient.ingredient_id)
+            if ratio is not None:
+                ingredient.cost = ingredient.cost * ratio
+        
+        costs = calculate_cocktail_costs(ingredients, data['profitMargin'], data['servings'])
+        updated_doc = {
+            'ingredients': [ingredient.dict() for ingredient in ingredients],
+            'totalCost': costs['total_cost'],
+            'sellingPrice': costs['selling_price'],
+            'costPerServing': costs['cost_per_serving'],
+            'updatedAt': now
+        }
+        writer.update(cocktail_doc.id, cocktail_doc.reference, updated_doc)
+        merged_docs[cocktail_doc.id] = {**data, **updated_doc}
+    
+    result = writer.commit()
+    for cocktail_id in result.committed:
+        notify_write('cocktails', user_id, cocktail_id, merged_docs[cocktail_id])
+    if result.failed:
+        raise Exception(f"Failed to update costs for {len(result.failed)} cocktails: {next(iter(result.failed.values()))}")
+    return len(result.committed)
+
+COCKTAIL_FIELDS = {
+    'user_id': 'userId',
+    'name': 'name',
+    'description': 'description',
+    'ingredients': 'ingredients',
+    'instructions': 'instructions',
+    'total_cost': 'totalCost',
+    'profit_margin': 'profitMargin',
+    'selling_price': 'sellingPrice',
+    'servings': 'servings',
+    'cost_per_serving': 'costPerServing',
+    'category': 'category',
+    'tags': 'tags',
+    'image_url': 'imageUrl',
+    'created_at': 'createdAt',
+    'updated_at': 'updatedAt'
+}
+
+def to_cocktail_response(doc_id: str, data: dict) -> CocktailResponse:
+    """Build a response from a stored document"""
+    return CocktailResponse(
+        id=doc_id,
+        user_id=data['userId'],
+        name=data['name'],
+        description=data.get('description'),
+        ingredients=[
+            CocktailIngredient(**ingredient) for ingredient in data['ingredients']
+        ],
+        instructions=data['instructions'],
+        total_cost=data['totalCost'],
+        profit_margin=data['profitMargin'],
+        selling_price=data['sellingPrice'],
+        servings=data['servings'],
+        cost_per_serving=data['costPerServing'],
+        category=data['category'],
+        tags=data.get('tags', []),
+        image_url=data.get('imageUrl'),
+        created_at=data['createdAt'],
+        updated_at=data['updatedAt']
+    )
+
+fast_cocktail = fast_json.serializer(
+    COCKTAIL_FIELDS,
+    floats=('total_cost', 'profit_margin', 'selling_price', 'cost_per_serving'),
+    defaults={'tags': []}
+)
+
 @router.get("/", response_model=List[CocktailResponse])
-async def get_cocktails(user_id: str):
+async def get_cocktails(
+    user_id: str = Depends(get_user_id),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal['json', 'ndjson'] = 'json',
+    cache_headers: Dict[str, str] = Depends(collection_etag('cocktails'))
+):
     """Get all cocktails for a user"""
-    db = get_firestore_client()
+    if limit is None and cursor is None and fields is None and format == 'json':
+        docs = await cocktail_repo.list_for_user(user_id)
+        if fast_json.FAST_RESPONSES:
+            return fast_json.fast_list_response(docs, fast_cocktail, cache_headers)
+        return [to_cocktail_response(doc_id, data) for doc_id, data in docs]
     
-    cocktails_ref = db.collection('cocktails')
-    cocktails_query = cocktails_ref.where('userId', '==', user_id).get()
-    
-    cocktails = []
-    for doc in cocktails_query:
-        data = doc.to_dict()
-        cocktails.append(CocktailResponse(
-            id=doc.id,
-            user_id=data['userId'],
-            name=data['name'],
-            description=data.get('description'),
-            ingredients=[
-                CocktailIngredient(**ingredient) for ingredient in data['ingredients']
-            ],
-            instructions=data['instructions'],
-            total_cost=data['totalCost'],
-            profit_margin=data['profitMargin'],
-            selling_price=data['sellingPrice'],
-            servings=data['servings'],
-            cost_per_serving=data['costPerServing'],
-            category=data['category'],
-            tags=data.get('tags', []),
-            image_url=data.get('imageUrl'),
-            created_at=data['createdAt'],
-            updated_at=data['updatedAt']
-        ))
-    
-    return cocktails
+    # Paged, projected or streamed listings go straight to Firestore
+    selected = parse_fields(fields, COCKTAIL_FIELDS)
+    db = get_firestore_client()
+    query = build_list_query(db, 'cocktails', user_id, limit, cursor, selected, COCKTAIL_FIELDS)
+    full = fast_cocktail if fast_json.FAST_RESPONSES else to_cocktail_response
+    serialize = full if selected is None else project(selected, COCKTAIL_FIELDS)
+    return await run_blocking(list_response, query, serialize, limit, stream=format == 'ndjson', headers=cache_headers)
 
 @router.post("/", response_model=CocktailResponse)
-async def create_cocktail(user_id: str, cocktail_data: CocktailCreate):
+async def create_cocktail(cocktail_data: CocktailCreate, user_id: str = Depends(get_user_id)):
     """Create a new cocktail"""
     db = get_firestore_client()
     
@@ -123,7 +271,11 @@ async def create_cocktail(user_id: str, cocktail_data: CocktailCreate):
         'updatedAt': now
     }
     
-    db.collection('cocktails').document(cocktail_id).set(cocktail_doc)
+    batch = db.batch()
+    batch.set(db.collection('cocktails').document(cocktail_id), cocktail_doc)
+    update_ingredient_usage(db, batch, user_id, cocktail_id, set(), get_ingredient_ids(cocktail_doc['ingredients']))
+    await run_blocking(batch.commit)
+    notify_write('cocktails', user_id, cocktail_id, cocktail_doc)
     
     return CocktailResponse(
         id=cocktail_id,
@@ -145,19 +297,11 @@ async def create_cocktail(user_id: str, cocktail_data: CocktailCreate):
     )
 
 @router.put("/{cocktail_id}", response_model=CocktailResponse)
-async def update_cocktail(cocktail_id: str, user_id: str, cocktail_data: CocktailCreate):
+async def update_cocktail(cocktail_id: str, cocktail_data: CocktailCreate, user_id: str = Depends(get_user_id)):
     """Update a cocktail"""
     db = get_firestore_client()
-    
     cocktail_ref = db.collection('cocktails').document(cocktail_id)
-    cocktail_doc = cocktail_ref.get()
-    
-    if not cocktail_doc.exists:
-        raise HTTPException(status_code=404, detail="Cocktail not found")
-    
-    existing_data = cocktail_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    existing_data = await cocktail_repo.get_owned(cocktail_id, user_id)
     
     # Calculate costs
     costs = calculate_cocktail_costs(
@@ -182,29 +326,122 @@ async def update_cocktail(cocktail_id: str, user_id: str, cocktail_data: Cocktai
         'updatedAt': datetime.utcnow()
     }
     
-    cocktail_ref.update(updated_doc)
-    
-    return CocktailResponse(
-        id=cocktail_id,
-        user_id=user_id,
-        created_at=existing_data['createdAt'],
-        **updated_doc
+    batch = db.batch()
+    batch.update(cocktail_ref, updated_doc)
+    update_ingredient_usage(
+        db, batch, user_id, cocktail_id,
+        get_ingredient_ids(existing_data['ingredients']),
+        get_ingredient_ids(updated_doc['ingredients'])
     )
+    await run_blocking(batch.commit)
+    merged_doc = {**existing_data, **updated_doc}
+    notify_write('cocktails', user_id, cocktail_id, merged_doc)
+    
+    return to_cocktail_response(cocktail_id, merged_doc)
 
 @router.delete("/{cocktail_id}")
-async def delete_cocktail(cocktail_id: str, user_id: str):
+async def delete_cocktail(cocktail_id: str, user_id: str = Depends(get_user_id)):
     """Delete a cocktail"""
     db = get_firestore_client()
-    
     cocktail_ref = db.collection('cocktails').document(cocktail_id)
-    cocktail_doc = cocktail_ref.get()
+    existing_data = await cocktail_repo.get_owned(cocktail_id, user_id)
+    
+    batch = db.batch()
+    batch.delete(cocktail_ref)
+    update_ingredient_usage(db, batch, user_id, cocktail_id, get_ingredient_ids(existing_data['ingredients']), set())
+    await run_blocking(batch.commit)
+    notify_write('cocktails', user_id, cocktail_id, None)
+    return {"message": "Cocktail deleted successfully"}
+
+@router.post("/ingredient-usage/rebuild")
+async def rebuild_ingredient_usage(user_id: str = Depends(get_user_id)):
+    """Rebuild the ingredient -> cocktails index for cocktails saved before it existed or before it was keyed per user"""
+    db = get_firestore_client()
+    
+    usage = {}
+    for doc_id, data in await cocktail_repo.list_for_user(user_id):
+        for ingredient_id in get_ingredient_ids(data['ingredients']):
+            usage.setdefault(ingredient_id, []).append(doc_id)
+    
+    # Remove the user's other usage docs, including any under the old
+    # non-per-user keys, so ingredients no cocktail uses any more drop out
+    usage_ref = db.collection(USAGE_COLLECTION)
+    existing = await run_blocking(
+        lambda: [doc.id for doc in usage_ref.where('userId', '==', user_id).select(['userId']).stream()]
+    )
+    current = {usage_doc_id(user_id, ingredient_id) for ingredient_id in usage}
     
-    if not cocktail_doc.exists:
-        raise HTTPException(status_code=404, detail="Cocktail not found")
+    writer = BatchWriter(db)
+    for doc_id in existing:
+        if doc_id not in current:
+            writer.delete(f"delete:{doc_id}", usage_ref.document(doc_id))
+    for ingredient_id, cocktail_ids in usage.items():
+        writer.set(ingredient_id, usage_ref.document(usage_doc_id(user_id, ingredient_id)), {
+            'userId': user_id,
+            'cocktailIds': cocktail_ids
+        })
+    result = await run_blocking(writer.commit)
+    
+    return {
+        'indexed_ingredients': len([label for label in result.committed if label in usage]),
+        'errors': [f"Error indexing {label}: {error}" for label, error in result.failed.items()]
+    }
+
+def resolve_type_changes(user_id: str, type_changes: Dict[str, float]) -> Dict[str, float]:
+    """Expand per-type % changes to the ids of the user's matching items and ingredients"""
+    wanted = {type_name.lower(): percent for type_name, percent in type_changes.items()}
+    changes = {}
+    
+    for doc_id, data in get_user_documents('alcohol_items', user_id):
+        percent = wanted.get(str(data.get('type', '')).lower())
+        if percent is not None:
+            changes[doc_id] = percent
+    
+    for doc_id, data in get_user_documents('ingredients', user_id):
+        for key in ('category', 'type'):
+            percent = wanted.get(str(data.get(key, '')).lower())
+            if percent is not None:
+                changes[doc_id] = percent
+                break
+    
+    return changes
+
+def evaluate_what_if(user_id: str, docs, changes: Dict[str, float]) -> WhatIfResponse:
+    """Price every cocktail now and under the given % changes, from the user's menu matrix"""
+    # numpy loads on first use, keeping it out of cold starts
+    from utils.menu_pricing import get_menu_matrix
+    
+    menu = get_menu_matrix(user_id, docs)
+    current = menu.evaluate(menu.multipliers({}))
+    scenario = menu.evaluate(menu.multipliers(changes))
+    
+    columns = {}
+    for field in ('total_cost', 'cost_per_serving', 'selling_price'):
+        columns[field] = current[field].tolist()
+        columns['new_' + field] = scenario[field].tolist()
+    
+    cocktails = [
+        WhatIfCocktail(
+            id=cocktail_id,
+            name=menu.names[row],
+            **{field: values[row] for field, values in columns.items()}
+        )
+        for row, cocktail_id in enumerate(menu.cocktail_ids)
+    ]
+    
+    return WhatIfResponse(
+        cocktails=cocktails,
+        total_cost_change=float(scenario['total_cost'].sum() - current['total_cost'].sum())
+    )
+
+@router.post("/what-if", response_model=WhatIfResponse)
+async def price_what_if(request: WhatIfRequest, user_id: str = Depends(get_user_id)):
+    """Recalculate every cocktail's cost and selling price under hypothetical price changes"""
+    docs = await cocktail_repo.list_for_user(user_id)
     
-    existing_data = cocktail_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    # Explicit per-ingredient changes win over per-type ones
+    changes = await run_blocking(resolve_type_changes, user_id, request.type_changes) if request.type_changes else {}
+    changes.update(request.ingredient_changes)
     
-    cocktail_ref.delete()
-    return {"message": "Cocktail deleted successfully"}
\ No newline at end of file
+    # Building the matrix and evaluating it are CPU-bound; keep them off the event loop
+    return await run_blocking(evaluate_what_if, user_id, docs, changes)
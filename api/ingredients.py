@@ -1,12 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Query, Request
 from pydantic import BaseModel
 from utils.firebase_utils import get_firestore_client
-from typing import List, Optional
+from utils.repository import Repository, run_blocking
+from utils.session import get_user_id
+from utils import fast_json
+from utils.http_cache import collection_etag
+from utils.list_query import MAX_PAGE_SIZE, parse_fields, build_list_query, project, list_response
+from utils.bulk import import_rows, export_response
+from cocktails import propagate_price_changes
+from typing import List, Optional, Literal, Dict
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+ingredient_repo = Repository('ingredients', 'Ingredient')
+
 class IngredientCreate(BaseModel):
     name: str
     type: str  # 'alcohol', 'mixer', 'garnish', 'other'
@@ -32,41 +41,21 @@ def calculate_price_per_unit(price: float, unit: str) -> float:
     # This would need more sophisticated logic based on unit types
     return price  # For now, assume price is already per unit
 
-@router.get("/", response_model=List[IngredientResponse])
-async def get_ingredients(user_id: str):
-    """Get all ingredients for a user"""
-    db = get_firestore_client()
-    
-    ingredients_ref = db.collection('ingredients')
-    ingredients_query = ingredients_ref.where('userId', '==', user_id).get()
-    
-    ingredients = []
-    for doc in ingredients_query:
-        data = doc.to_dict()
-        ingredients.append(IngredientResponse(
-            id=doc.id,
-            user_id=data['userId'],
-            name=data['name'],
-            type=data['type'],
-            category=data['category'],
-            price=data['price'],
-            unit=data['unit'],
-            price_per_unit=data['pricePerUnit'],
-            shop=data['shop'],
-            last_updated=data['lastUpdated']
-        ))
-    
-    return ingredients
+INGREDIENT_FIELDS = {
+    'user_id': 'userId',
+    'name': 'name',
+    'type': 'type',
+    'category': 'category',
+    'price': 'price',
+    'unit': 'unit',
+    'price_per_unit': 'pricePerUnit',
+    'shop': 'shop',
+    'last_updated': 'lastUpdated'
+}
 
-@router.post("/", response_model=IngredientResponse)
-async def create_ingredient(user_id: str, ingredient_data: IngredientCreate):
-    """Create a new ingredient"""
-    db = get_firestore_client()
-    
-    ingredient_id = str(uuid.uuid4())
-    price_per_unit = calculate_price_per_unit(ingredient_data.price, ingredient_data.unit)
-    
-    ingredient_doc = {
+def build_ingredient_doc(ingredient_id: str, user_id: str, ingredient_data: IngredientCreate, now: datetime) -> dict:
+    """Build the stored document for a new ingredient"""
+    return {
         'id': ingredient_id,
         'userId': user_id,
         'name': ingredient_data.name,
@@ -74,12 +63,63 @@ async def create_ingredient(user_id: str, ingredient_data: IngredientCreate):
         'category': ingredient_data.category,
         'price': ingredient_data.price,
         'unit': ingredient_data.unit,
-        'pricePerUnit': price_per_unit,
+        'pricePerUnit': calculate_price_per_unit(ingredient_data.price, ingredient_data.unit),
         'shop': ingredient_data.shop,
-        'lastUpdated': datetime.utcnow()
+        'lastUpdated': now
     }
+
+def to_ingredient_response(doc_id: str, data: dict) -> IngredientResponse:
+    """Build a response from a stored document"""
+    return IngredientResponse(
+        id=doc_id,
+        user_id=data['userId'],
+        name=data['name'],
+        type=data['type'],
+        category=data['category'],
+        price=data['price'],
+        unit=data['unit'],
+        price_per_unit=data['pricePerUnit'],
+        shop=data['shop'],
+        last_updated=data['lastUpdated']
+    )
+
+fast_ingredient = fast_json.serializer(
+    INGREDIENT_FIELDS,
+    floats=('price', 'price_per_unit')
+)
+
+@router.get("/", response_model=List[IngredientResponse])
+async def get_ingredients(
+    user_id: str = Depends(get_user_id),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal['json', 'ndjson'] = 'json',
+    cache_headers: Dict[str, str] = Depends(collection_etag('ingredients'))
+):
+    """Get all ingredients for a user"""
+    if limit is None and cursor is None and fields is None and format == 'json':
+        docs = await ingredient_repo.list_for_user(user_id)
+        if fast_json.FAST_RESPONSES:
+            return fast_json.fast_list_response(docs, fast_ingredient, cache_headers)
+        return [to_ingredient_response(doc_id, data) for doc_id, data in docs]
+    
+    # Paged, projected or streamed listings go straight to Firestore
+    selected = parse_fields(fields, INGREDIENT_FIELDS)
+    db = get_firestore_client()
+    query = build_list_query(db, 'ingredients', user_id, limit, cursor, selected, INGREDIENT_FIELDS)
+    full = fast_ingredient if fast_json.FAST_RESPONSES else to_ingredient_response
+    serialize = full if selected is None else project(selected, INGREDIENT_FIELDS)
+    return await run_blocking(list_response, query, serialize, limit, stream=format == 'ndjson', headers=cache_headers)
+
+@router.post("/", response_model=IngredientResponse)
+async def create_ingredient(ingredient_data: IngredientCreate, user_id: str = Depends(get_user_id)):
+    """Create a new ingredient"""
+    ingredient_id = str(uuid.uuid4())
+    ingredient_doc = build_ingredient_doc(ingredient_id, user_id, ingredient_data, datetime.utcnow())
+    price_per_unit = ingredient_doc['pricePerUnit']
     
-    db.collection('ingredients').document(ingredient_id).set(ingredient_doc)
+    await ingredient_repo.create(ingredient_id, user_id, ingredient_doc)
     
     return IngredientResponse(
         id=ingredient_id,
@@ -94,20 +134,31 @@ async def create_ingredient(user_id: str, ingredient_data: IngredientCreate):
         last_updated=datetime.utcnow()
     )
 
+@router.post("/import")
+async def import_ingredients(request: Request, format: Literal['csv', 'ndjson'] = 'csv', user_id: str = Depends(get_user_id)):
+    """Create ingredients from a streamed CSV (with a header row) or NDJSON body"""
+    now = datetime.utcnow()
+    
+    def write_row(writer, ingredient_id: str, ingredient_data: IngredientCreate) -> dict:
+        ingredient_doc = build_ingredient_doc(ingredient_id, user_id, ingredient_data, now)
+        writer.set(ingredient_id, ingredient_repo.ref(ingredient_id), ingredient_doc)
+        return ingredient_doc
+    
+    return await import_rows(
+        request.stream(), format, IngredientCreate, write_row, get_firestore_client(), 'ingredients', user_id,
+        lambda: str(uuid.uuid4())
+    )
+
+@router.get("/export")
+async def export_ingredients(format: Literal['csv', 'ndjson'] = 'csv', user_id: str = Depends(get_user_id)):
+    """Stream all of a user's ingredients as CSV or NDJSON"""
+    query = build_list_query(get_firestore_client(), 'ingredients', user_id, None, None, None, INGREDIENT_FIELDS)
+    return export_response(query, INGREDIENT_FIELDS, format, 'ingredients')
+
 @router.put("/{ingredient_id}", response_model=IngredientResponse)
-async def update_ingredient(ingredient_id: str, user_id: str, ingredient_data: IngredientCreate):
+async def update_ingredient(ingredient_id: str, ingredient_data: IngredientCreate, user_id: str = Depends(get_user_id)):
     """Update an ingredient"""
-    db = get_firestore_client()
-    
-    ingredient_ref = db.collection('ingredients').document(ingredient_id)
-    ingredient_doc = ingredient_ref.get()
-    
-    if not ingredient_doc.exists:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    
-    existing_data = ingredient_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    existing_data = await ingredient_repo.get_owned(ingredient_id, user_id)
     
     price_per_unit = calculate_price_per_unit(ingredient_data.price, ingredient_data.unit)
     
@@ -122,28 +173,20 @@ async def update_ingredient(ingredient_id: str, user_id: str, ingredient_data: I
         'lastUpdated': datetime.utcnow()
     }
     
-    ingredient_ref.update(updated_doc)
+    merged_doc = await ingredient_repo.update(ingredient_id, user_id, existing_data, updated_doc)
     
-    return IngredientResponse(
-        id=ingredient_id,
-        user_id=user_id,
-        **updated_doc
-    )
+    # Re-cost the cocktails that use this ingredient
+    old_price_per_unit = existing_data.get('pricePerUnit')
+    if old_price_per_unit and price_per_unit != old_price_per_unit:
+        await run_blocking(propagate_price_changes, get_firestore_client(), user_id, {
+            ingredient_id: price_per_unit / old_price_per_unit
+        })
+    
+    return to_ingredient_response(ingredient_id, merged_doc)
 
 @router.delete("/{ingredient_id}")
-async def delete_ingredient(ingredient_id: str, user_id: str):
+async def delete_ingredient(ingredient_id: str, user_id: str = Depends(get_user_id)):
     """Delete an ingredient"""
-    db = get_firestore_client()
-    
-    ingredient_ref = db.collection('ingredients').document(ingredient_id)
-    ingredient_doc = ingredient_ref.get()
-    
-    if not ingredient_doc.exists:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    
-    existing_data = ingredient_doc.to_dict()
-    if existing_data['userId'] != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    ingredient_ref.delete()
+    await ingredient_repo.get_owned(ingredient_id, user_id)
+    await ingredient_repo.delete(ingredient_id, user_id)
     return {"message": "Ingredient deleted successfully"}
\ No newline at end of file
@@ -1,12 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Literal
+from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from auth import router as auth_router
 from alcohol_items import router as alcohol_router
 from ingredients import router as ingredients_router
 from cocktails import router as cocktails_router
-from scraper import router as scraper_router
+from scraper import router as scraper_router, start_price_job_workers
+from search import router as search_router
+from utils.list_cache import list_cache
+from utils.firebase_utils import get_firestore_client
+from utils import metrics
+from utils.profiling import ProfilingMiddleware, profile_store
+from utils.compression import CompressionMiddleware
+from utils.session import get_user_id
 
-app = FastAPI(title="Bar Price Tracker API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the Firestore client once per process, before the first request
+    if os.getenv('WARM_UP_FIRESTORE', '1') != '0':
+        try:
+            await asyncio.to_thread(get_firestore_client)
+        except Exception as e:
+            logger.warning("Firestore warm-up failed, connecting on first request: %s", e)
+    
+    # Background price refresh workers (set JOB_WORKERS=0 to disable)
+    workers = start_price_job_workers(int(os.getenv('JOB_WORKERS', '1')))
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+app = FastAPI(title="Bar Price Tracker API", version="1.0.0", lifespan=lifespan)
+
+# Innermost, so the profiler sees the endpoint run on the request's own task
+app.add_middleware(ProfilingMiddleware)
 
 # Enable CORS
 app.add_middleware(
@@ -17,13 +52,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip, or brotli when installed, for bodies over COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+def route_template(request: Request) -> str:
+    """The matched route's path template, so ids don't explode label cardinality"""
+    route = request.scope.get('route')
+    if route is None:
+        return 'unmatched'
+    # The route's path leaves out its router's prefix: keep the leading
+    # URL segments the template doesn't account for
+    segments = request.url.path.split('/')
+    prefix = '/'.join(segments[:len(segments) - route.path.count('/')])
+    return prefix + route.path
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Record latency, status code and datastore operations per route"""
+    operations = metrics.start_request()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.finish_request(
+            request.method, route_template(request), status, time.perf_counter() - started, operations
+        )
+
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 app.include_router(alcohol_router, prefix="/alcohol", tags=["alcohol"])
 app.include_router(ingredients_router, prefix="/ingredients", tags=["ingredients"])
 app.include_router(cocktails_router, prefix="/cocktails", tags=["cocktails"])
 app.include_router(scraper_router, prefix="/scraper", tags=["scraper"])
+app.include_router(search_router, prefix="/search", tags=["search"])
 
 @app.get("/")
 async def root():
-    return {"message": "Bar Price Tracker API"}
\ No newline at end of file
+    return {"message": "Bar Price Tracker API"}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Get list cache hit ratio and memory use"""
+    return list_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Get request, datastore and scraper metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: Literal['json', 'folded'] = 'json', user_id: str = Depends(get_user_id)):
+    """Get a stored request profile, as a call tree or as folded stacks for flamegraph tools"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if profile.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if format == 'folded':
+        return PlainTextResponse(profile.folded())
+    return profile.report()
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
-import re
-from typing import Optional, Dict, Any
+import asyncio
+import functools
+import os
+import time
+import uuid
+from typing import Optional, Dict, Any, List, Callable
 from utils.firebase_utils import get_firestore_client
+from utils.firestore_batch import BatchWriter
+from utils.write_events import notify_write
+from utils.session import get_user_id
+from utils.repository import run_blocking
+from utils.job_queue import job_queue
+from utils import metrics
+from utils.profiling import traced
+from cocktails import propagate_price_changes
 from datetime import datetime
 
 router = APIRouter()
 
+PRICE_JOB = 'update-prices'
+CATALOG_JOB = 'update-catalog'
+JOB_CHUNK_SIZE = int(os.getenv('JOB_CHUNK_SIZE', '50'))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '2'))
+
+# Users allowed to refresh the shared product catalog for everyone, comma separated
+CATALOG_ADMIN_USERS = {user.strip() for user in os.getenv('CATALOG_ADMIN_USERS', '').split(',') if user.strip()}
+
 class ScrapeRequest(BaseModel):
     product_url: str
 
@@ -17,138 +35,90 @@ class ScrapeResponse(BaseModel):
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
-def clean_text(text: str) -> str:
-    """Clean and normalize text"""
-    return re.sub(r'\s+', ' ', text.strip()) if text else ""
+class ListingRequest(BaseModel):
+    listing_url: str
 
-def extract_price(price_text: str) -> Optional[float]:
-    """Extract price from text"""
-    if not price_text:
-        return None
-    
-    # Remove currency symbols and extract numbers
-    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-    if price_match:
-        try:
-            return float(price_match.group().replace(',', ''))
-        except ValueError:
-            return None
-    return None
+class ListingResponse(BaseModel):
+    success: bool
+    tiles: List[Dict[str, Any]] = []
+    error: Optional[str] = None
 
-def extract_volume(text: str) -> Optional[int]:
-    """Extract volume in ml from text"""
-    if not text:
-        return None
-    
-    # Look for ml pattern
-    ml_match = re.search(r'(\d+(?:\.\d+)?)\s*ml', text.lower())
-    if ml_match:
-        return int(float(ml_match.group(1)))
+class UpdatePricesRequest(BaseModel):
+    listing_urls: List[str] = []
+    fallback_to_product_pages: bool = True
+
+async def fetch_product_data(url: str) -> Dict[str, Any]:
+    """Fetch and parse a product page"""
+    from utils.extraction import extract_product
+    return await fetch_page_data(url, extract_product)
+
+async def fetch_listing_data(url: str) -> List[Dict[str, Any]]:
+    """Fetch and parse a category or search listing page into product tiles"""
+    from utils.extraction import extract_listing
+    return await fetch_page_data(url, functools.partial(extract_listing, base_url=url))
+
+async def fetch_page_data(url: str, parse: Callable[[bytes], Any]) -> Any:
+    """Fetch a retailer page and parse it, skipping the parse when the page is unchanged"""
+    # Scraper-only dependencies (httpx, lxml) load on first use, not at cold start
+    from utils.http_client import fetch, CircuitOpenError
+    from utils.page_cache import page_cache, conditional_headers, hash_body
     
-    # Look for L pattern and convert to ml
-    l_match = re.search(r'(\d+(?:\.\d+)?)\s*l(?:itre)?', text.lower())
-    if l_match:
-        return int(float(l_match.group(1)) * 1000)
+    retailer = metrics.retailer_for(url)
+    # The page cache lives on local disk; keep its reads and writes off the event loop
+    entry = await asyncio.to_thread(page_cache.get, url)
+    started = time.perf_counter()
+    try:
+        response = await fetch(url, headers=conditional_headers(entry))
+        if response.status_code != 304 or not entry:
+            response.raise_for_status()
+    except CircuitOpenError:
+        metrics.SCRAPER_FAILURES.inc(retailer, 'circuit_open')
+        raise
+    except Exception:
+        metrics.SCRAPER_FAILURES.inc(retailer, 'fetch')
+        raise
+    finally:
+        metrics.SCRAPER_FETCH_DURATION.observe(time.perf_counter() - started, retailer)
     
-    return None
-
-def extract_alcohol_percentage(text: str) -> Optional[float]:
-    """Extract alcohol percentage from text"""
-    if not text:
-        return None
+    if response.status_code == 304 and entry:
+        page_cache.record('not_modified')
+        return entry['data']
     
-    # Look for percentage pattern
-    percentage_match = re.search(r'(\d+(?:\.\d+)?)\s*%', text)
-    if percentage_match:
-        return float(percentage_match.group(1))
+    body_hash = hash_body(response.content)
+    if entry and entry['bodyHash'] == body_hash:
+        page_cache.record('unchanged')
+        data = entry['data']
+    else:
+        page_cache.record('misses')
+        started = time.perf_counter()
+        try:
+            # Parse off the event loop so concurrent fetches keep flowing
+            data = await asyncio.to_thread(traced(parse), response.content)
+        except Exception:
+            metrics.SCRAPER_FAILURES.inc(retailer, 'parse')
+            raise
+        finally:
+            metrics.SCRAPER_PARSE_DURATION.observe(time.perf_counter() - started, retailer)
     
-    return None
+    await asyncio.to_thread(page_cache.put, url, {
+        'etag': response.headers.get('ETag'),
+        'lastModified': response.headers.get('Last-Modified'),
+        'bodyHash': body_hash,
+        'data': data
+    })
+    return data
 
 async def scrape_bws_product(url: str) -> Dict[str, Any]:
     """Scrape BWS product page"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract product name
-        name_elem = soup.find('h1') or soup.find('h2')
-        name = clean_text(name_elem.get_text()) if name_elem else ""
-        
-        # Extract price
-        price_elem = soup.find('span', class_=re.compile(r'price|amount')) or soup.find(text=re.compile(r'\$\d+'))
-        price_text = clean_text(str(price_elem)) if price_elem else ""
-        price = extract_price(price_text)
-        
-        # Extract brand (usually first part of name)
-        brand = name.split()[0] if name else ""
-        
-        # Extract volume
-        volume_text = name + " " + soup.get_text()
-        volume = extract_volume(volume_text)
-        
-        # Extract alcohol percentage
-        alcohol_percentage = extract_alcohol_percentage(volume_text)
-        
-        # Extract image
-        img_elem = soup.find('img', src=re.compile(r'product|item'))
-        image_url = img_elem.get('src') if img_elem else None
-        
-        return {
-            'name': name,
-            'brand': brand,
-            'price': price,
-            'size': volume,
-            'alcohol_percentage': alcohol_percentage,
-            'image_url': image_url
-        }
-        
+        return await fetch_product_data(url)
     except Exception as e:
         raise Exception(f"Failed to scrape BWS: {str(e)}")
 
 async def scrape_liquorland_product(url: str) -> Dict[str, Any]:
     """Scrape Liquorland product page"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Similar logic to BWS but adapted for Liquorland structure
-        name_elem = soup.find('h1') or soup.find('h2')
-        name = clean_text(name_elem.get_text()) if name_elem else ""
-        
-        price_elem = soup.find('span', class_=re.compile(r'price|amount')) or soup.find(text=re.compile(r'\$\d+'))
-        price_text = clean_text(str(price_elem)) if price_elem else ""
-        price = extract_price(price_text)
-        
-        brand = name.split()[0] if name else ""
-        
-        volume_text = name + " " + soup.get_text()
-        volume = extract_volume(volume_text)
-        alcohol_percentage = extract_alcohol_percentage(volume_text)
-        
-        img_elem = soup.find('img', src=re.compile(r'product|item'))
-        image_url = img_elem.get('src') if img_elem else None
-        
-        return {
-            'name': name,
-            'brand': brand,
-            'price': price,
-            'size': volume,
-            'alcohol_percentage': alcohol_percentage,
-            'image_url': image_url
-        }
-        
+        return await fetch_product_data(url)
     except Exception as e:
         raise Exception(f"Failed to scrape Liquorland: {str(e)}")
 
@@ -170,30 +140,133 @@ async def scrape_product(request: ScrapeRequest):
     except Exception as e:
         return ScrapeResponse(success=False, error=str(e))
 
-@router.post("/update-prices")
-async def update_all_prices(user_id: str):
-    """Update prices for all items with product URLs"""
-    db = get_firestore_client()
+@router.post("/scrape-listing", response_model=ListingResponse)
+async def scrape_listing(request: ListingRequest):
+    """Scrape name, price, size and product URL for every tile on a listing page"""
+    url = request.listing_url.lower()
+    if 'bws.com.au' not in url and 'liquorland.com.au' not in url:
+        return ListingResponse(success=False, error="Unsupported retailer")
     
-    # Get all alcohol items with product URLs
-    items_ref = db.collection('alcohol_items')
-    items_query = items_ref.where('userId', '==', user_id).where('productUrl', '!=', None).get()
+    try:
+        return ListingResponse(success=True, tiles=await fetch_listing_data(request.listing_url))
+    except Exception as e:
+        return ListingResponse(success=False, error=f"Failed to scrape listing: {str(e)}")
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get product page cache hit/miss counters"""
+    from utils.page_cache import page_cache
+    # The first call lists the cache directory
+    return await asyncio.to_thread(page_cache.stats)
+
+@router.get("/host-stats")
+async def get_host_stats():
+    """Get each retailer host's adaptive limit, circuit state and retry counters"""
+    from utils.http_client import host_stats
+    return host_stats()
+
+async def scrape_many(urls: List[str]) -> Dict[str, ScrapeResponse]:
+    """Scrape many product URLs concurrently, each distinct URL once"""
+    unique_urls = list(dict.fromkeys(urls))
+    results = await asyncio.gather(*(
+        scrape_product(ScrapeRequest(product_url=url)) for url in unique_urls
+    ))
+    return dict(zip(unique_urls, results))
+
+def get_tracked_items(docs) -> List:
+    """Pair item documents with their data, keeping those with a product URL"""
+    tracked = [(doc, doc.to_dict()) for doc in docs if doc.exists]
+    return [(doc, item_data) for doc, item_data in tracked if item_data.get('productUrl')]
+
+async def scrape_from_listings(urls: List[str], listing_urls: List[str], fallback: bool):
+    """Price product URLs from the tiles of listing pages, one fetch per page
+
+    URLs not found on any listing page (or on a page that failed) are
+    scraped from their own product page when fallback is set. Returns the
+    results by URL, how many came from listing tiles, and listing errors.
+    """
+    from utils.product_urls import normalize_product_url
+    
+    tiles = {}
+    errors = []
+    listing_urls = list(dict.fromkeys(listing_urls))
+    listings = await asyncio.gather(*(
+        scrape_listing(ListingRequest(listing_url=url)) for url in listing_urls
+    ))
+    for listing_url, listing in zip(listing_urls, listings):
+        if not listing.success:
+            errors.append(f"Failed to read listing {listing_url}: {listing.error}")
+        for tile in listing.tiles:
+            if tile.get('price'):
+                tiles.setdefault(tile['product_url'], tile)
+    
+    results = {}
+    unmatched = []
+    matched = 0
+    for url in dict.fromkeys(urls):
+        tile = tiles.get(normalize_product_url(url))
+        if tile:
+            results[url] = ScrapeResponse(success=True, data=tile)
+            matched += 1
+        elif fallback:
+            unmatched.append(url)
+        else:
+            results[url] = ScrapeResponse(success=False, error="Not found on listing pages")
+    results.update(await scrape_many(unmatched))
+    return results, matched, errors
+
+async def scrape_through_catalog(db, urls: List[str], listing_urls: Optional[List[str]], fallback: bool):
+    """Scrape product URLs, reusing prices another refresh put in the catalog within CATALOG_MAX_AGE
+
+    Returns the results by URL, the URLs actually scraped, how many came
+    from listing tiles, and listing errors.
+    """
+    from utils.catalog import fresh_entries
     
-    updated_count = 0
+    cached = await run_blocking(fresh_entries, db, urls)
+    remaining = [url for url in urls if url not in cached]
+    listing_matched = 0
     errors = []
+    if listing_urls:
+        results, listing_matched, errors = await scrape_from_listings(remaining, listing_urls, fallback)
+    else:
+        results = await scrape_many(remaining)
+    scraped = list(results)
     
-    for doc in items_query:
+    for url, entry in cached.items():
+        results[url] = ScrapeResponse(success=True, data=entry)
+    return results, scraped, listing_matched, errors
+
+async def apply_prices(
+    db, tracked: List, scrape_results: Dict[str, ScrapeResponse], scraped: List[str], errors: List[str]
+) -> Dict[str, Any]:
+    """Write scraped prices to tracked items of any user and to the catalog in batched writes
+
+    Items not yet linked to their catalog entry are linked on the way.
+    """
+    from utils.price_series import append_price
+    from utils import catalog
+    
+    writer = BatchWriter(db)
+    price_ratios: Dict[str, Dict[str, float]] = {}
+    merged_docs = {}
+    price_changed = set()
+    now = datetime.utcnow()
+    
+    for url in scraped:
+        scrape_result = scrape_results[url]
+        if scrape_result.success and scrape_result.data:
+            catalog.record(writer, db, url, scrape_result.data, now)
+    
+    for doc, item_data in tracked:
         try:
-            item_data = doc.to_dict()
-            product_url = item_data.get('productUrl')
-            
-            if not product_url:
-                continue
-            
-            # Scrape current price
-            scrape_request = ScrapeRequest(product_url=product_url)
-            scrape_result = await scrape_product(scrape_request)
+            item_user_id = item_data['userId']
+            changes = {}
+            catalog_id = catalog.catalog_id(item_data['productUrl'])
+            if item_data.get('catalogId') != catalog_id:
+                changes['catalogId'] = catalog_id
             
+            scrape_result = scrape_results[item_data['productUrl']]
             if scrape_result.success and scrape_result.data:
                 new_price = scrape_result.data.get('price')
                 if new_price and new_price != item_data.get('price'):
@@ -201,31 +274,266 @@ async def update_all_prices(user_id: str):
                     size = item_data.get('size', 1)
                     price_per_liter = (new_price / size) * 1000 if size > 0 else new_price
                     
-                    doc.reference.update({
+                    old_price = item_data.get('price')
+                    if old_price:
+                        price_ratios.setdefault(item_user_id, {})[doc.id] = new_price / old_price
+                    
+                    changes.update({
                         'price': new_price,
                         'pricePerLiter': price_per_liter,
-                        'lastUpdated': datetime.utcnow()
+                        'lastUpdated': now
                     })
+                    price_changed.add(doc.id)
                     
                     # Store price history
-                    history_doc = {
-                        'itemId': doc.id,
-                        'itemType': 'alcohol',
-                        'price': new_price,
-                        'shop': item_data.get('shop', ''),
-                        'date': datetime.utcnow()
-                    }
-                    db.collection('price_history').add(history_doc)
-                    
-                    updated_count += 1
+                    append_price(writer, doc.id, db, doc.id, item_user_id, new_price, now)
             else:
                 errors.append(f"Failed to update {item_data.get('name', 'Unknown')}: {scrape_result.error}")
+            
+            if changes:
+                writer.update(doc.id, doc.reference, changes)
+                merged_docs[doc.id] = {**item_data, **changes}
                 
         except Exception as e:
             errors.append(f"Error updating {doc.id}: {str(e)}")
     
+    # Commit all price, history and catalog writes in as few batches as possible
+    write_result = await run_blocking(writer.commit)
+    for label, error in write_result.failed.items():
+        errors.append(f"Error updating {label}: {error}")
+    committed = [item_id for item_id in write_result.committed if item_id in merged_docs]
+    for item_id in committed:
+        notify_write('alcohol_items', merged_docs[item_id]['userId'], item_id, merged_docs[item_id])
+    
+    # Re-cost each user's cocktails that use the items whose price changed
+    for item_user_id, ratios in price_ratios.items():
+        try:
+            await run_blocking(propagate_price_changes, db, item_user_id, {
+                item_id: ratio for item_id, ratio in ratios.items() if item_id in committed
+            })
+        except Exception as e:
+            errors.append(f"Error updating cocktail costs: {str(e)}")
+    
     return {
-        'updated_count': updated_count,
+        'updated_count': len([item_id for item_id in committed if item_id in price_changed]),
+        'errors': errors,
+        'write_batches': write_result.batches
+    }
+
+async def refresh_items(
+    db, user_id: str, tracked: List, listing_urls: Optional[List[str]] = None, fallback: bool = True
+) -> Dict[str, Any]:
+    """Scrape a user's tracked items and commit any price changes in batched writes"""
+    # Scrape every tracked URL concurrently; per-host limits live in utils.http_client
+    urls = [item_data['productUrl'] for _, item_data in tracked]
+    scrape_results, scraped, listing_matched, errors = await scrape_through_catalog(db, urls, listing_urls, fallback)
+    
+    result = await apply_prices(db, tracked, scrape_results, scraped, errors)
+    result['listing_matched'] = listing_matched
+    return result
+
+@router.post("/update-prices")
+async def update_all_prices(request: Optional[UpdatePricesRequest] = None, user_id: str = Depends(get_user_id)):
+    """Update prices for all items with product URLs
+
+    With listing_urls, items are priced from the tiles of those category or
+    search pages, and only items missing from them fetch their own page.
+    """
+    request = request or UpdatePricesRequest()
+    db = get_firestore_client()
+    started = time.perf_counter()
+    
+    # Get all alcohol items with product URLs
+    items_ref = db.collection('alcohol_items')
+    items_query = await run_blocking(items_ref.where('userId', '==', user_id).where('productUrl', '!=', None).get)
+    
+    tracked = get_tracked_items(items_query)
+    result = await refresh_items(db, user_id, tracked, request.listing_urls, request.fallback_to_product_pages)
+    
+    elapsed = time.perf_counter() - started
+    
+    return {
+        'updated_count': result['updated_count'],
         'total_items': len(items_query),
-        'errors': errors
-    }
\ No newline at end of file
+        'errors': result['errors'],
+        'write_batches': result['write_batches'],
+        'listing_matched': result['listing_matched'],
+        'elapsed_seconds': round(elapsed, 3),
+        'items_per_second': round(len(tracked) / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+async def run_price_job(db, job: Dict[str, Any], worker_id: str):
+    """Refresh a job's items chunk by chunk, checkpointing after each chunk"""
+    item_ids = job['item_ids']
+    if item_ids is None:
+        items_ref = db.collection('alcohol_items')
+        items_query = await run_blocking(items_ref.where('userId', '==', job['user_id']).where('productUrl', '!=', None).get)
+        item_ids = [doc.id for doc, _ in get_tracked_items(items_query)]
+        if not await run_blocking(job_queue.set_items, job['id'], worker_id, item_ids):
+            return
+    
+    # Resume from the last checkpoint
+    done = job['done']
+    updated_count = job['updated_count']
+    errors = job['errors']
+    
+    while done < len(item_ids):
+        chunk_ids = item_ids[done:done + JOB_CHUNK_SIZE]
+        refs = [db.collection('alcohol_items').document(item_id) for item_id in chunk_ids]
+        snapshots = await run_blocking(lambda: list(db.get_all(refs)))
+        result = await refresh_items(db, job['user_id'], get_tracked_items(snapshots))
+        
+        done += len(chunk_ids)
+        updated_count += result['updated_count']
+        errors.extend(result['errors'])
+        if not await run_blocking(job_queue.checkpoint, job['id'], worker_id, done, updated_count, errors):
+            # Another worker took the job over
+            return
+    
+    await run_blocking(job_queue.finish, job['id'], worker_id, 'done')
+
+async def keep_lease(job_id: str, worker_id: str):
+    """Renew a job's lease while it runs, so a slow chunk is not taken over mid-way"""
+    while True:
+        await asyncio.sleep(job_queue.lease_seconds / 3)
+        if not await run_blocking(job_queue.heartbeat, job_id, worker_id):
+            return
+
+async def price_job_worker(worker_id: str):
+    """Claim and run price refresh and catalog refresh jobs until cancelled"""
+    while True:
+        for kind, run_job in JOB_RUNNERS.items():
+            job = await run_blocking(job_queue.claim, kind, worker_id)
+            if job is not None:
+                break
+        else:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            continue
+        
+        heartbeat = asyncio.create_task(keep_lease(job['id'], worker_id))
+        try:
+            await run_job(get_firestore_client(), job, worker_id)
+        except Exception as e:
+            await run_blocking(job_queue.finish, job['id'], worker_id, 'failed', f"Job failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+
+def start_price_job_workers(count: int) -> List[asyncio.Task]:
+    """Start price refresh workers on the running event loop"""
+    return [
+        asyncio.create_task(price_job_worker(f"{os.getpid()}-{index}-{uuid.uuid4().hex[:8]}"))
+        for index in range(count)
+    ]
+
+async def refresh_catalog(db, entries: Dict[str, str]) -> Dict[str, Any]:
+    """Scrape catalog products (product URL by entry id) once each and fan new prices out to all linked items
+
+    Only entries some item still links to are scraped; the rest are deleted,
+    so retailer traffic follows the products actually tracked.
+    """
+    from utils import catalog
+    
+    linked = get_tracked_items(await run_blocking(catalog.linked_items, db, list(entries)))
+    linked_ids = {item_data['catalogId'] for _, item_data in linked}
+    orphaned = [entry_id for entry_id in entries if entry_id not in linked_ids]
+    if orphaned:
+        await run_blocking(catalog.remove_entries, db, orphaned)
+    
+    urls = list(dict.fromkeys(url for entry_id, url in entries.items() if entry_id in linked_ids))
+    scrape_results = await scrape_many(urls)
+    
+    tracked = [
+        (doc, item_data) for doc, item_data in linked
+        if scrape_results[entries[item_data['catalogId']]].success
+    ]
+    for _, item_data in tracked:
+        scrape_results[item_data['productUrl']] = scrape_results[entries[item_data['catalogId']]]
+    
+    errors = [f"Failed to scrape {url}: {result.error}" for url, result in scrape_results.items() if not result.success]
+    result = await apply_prices(db, tracked, scrape_results, urls, errors)
+    return {
+        'products': len(urls),
+        'linked_items': len(tracked),
+        'removed_entries': len(orphaned),
+        **result
+    }
+
+async def run_catalog_job(db, job: Dict[str, Any], worker_id: str):
+    """Refresh the catalog chunk by chunk of entries, checkpointing after each chunk"""
+    from utils import catalog
+    
+    entry_ids = job['item_ids']
+    if entry_ids is None:
+        entry_ids = list(await run_blocking(catalog.list_entries, db))
+        if not await run_blocking(job_queue.set_items, job['id'], worker_id, entry_ids):
+            return
+    
+    # Resume from the last checkpoint
+    done = job['done']
+    updated_count = job['updated_count']
+    errors = job['errors']
+    
+    while done < len(entry_ids):
+        chunk_ids = entry_ids[done:done + JOB_CHUNK_SIZE]
+        refs = [db.collection(catalog.CATALOG_COLLECTION).document(entry_id) for entry_id in chunk_ids]
+        snapshots = await run_blocking(lambda: list(db.get_all(refs)))
+        entries = {
+            snapshot.id: snapshot.get('productUrl')
+            for snapshot in snapshots if snapshot.exists and snapshot.get('productUrl')
+        }
+        result = await refresh_catalog(db, entries)
+        
+        done += len(chunk_ids)
+        updated_count += result['updated_count']
+        errors.extend(result['errors'])
+        if not await run_blocking(job_queue.checkpoint, job['id'], worker_id, done, updated_count, errors):
+            # Another worker took the job over
+            return
+    
+    await run_blocking(job_queue.finish, job['id'], worker_id, 'done')
+
+# Job kind -> runner, in the order idle workers look for work
+JOB_RUNNERS = {
+    PRICE_JOB: run_price_job,
+    CATALOG_JOB: run_catalog_job
+}
+
+@router.post("/update-catalog")
+async def update_catalog_prices(user_id: str = Depends(get_user_id)):
+    """Queue a background refresh of every product in the shared catalog, scraping each distinct URL once
+
+    Progress is reported by GET /scraper/jobs/{job_id}.
+    """
+    if user_id not in CATALOG_ADMIN_USERS:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    job_id = await run_blocking(job_queue.submit, CATALOG_JOB, user_id)
+    return {'job_id': job_id, 'status': 'queued'}
+
+@router.post("/update-prices/jobs")
+async def submit_price_update_job(user_id: str = Depends(get_user_id)):
+    """Queue a background price refresh for all items with product URLs"""
+    job_id = await run_blocking(job_queue.submit, PRICE_JOB, user_id)
+    return {'job_id': job_id, 'status': 'queued'}
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, user_id: str = Depends(get_user_id)):
+    """Get the progress of a background price or catalog refresh"""
+    job = await run_blocking(job_queue.get, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job['user_id'] != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'done': job['done'],
+        'total': job['total'],
+        'updated_count': job['updated_count'],
+        'errors': job['errors'],
+        'created_at': datetime.utcfromtimestamp(job['created_at']),
+        'updated_at': datetime.utcfromtimestamp(job['updated_at'])
+    }
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from utils.repository import run_blocking
+from utils.session import get_user_id
+from utils.search_index import search_index
+from typing import List, Optional, Literal
+
+router = APIRouter()
+
+class SearchResult(BaseModel):
+    id: str
+    kind: str  # 'alcohol', 'ingredient' or 'cocktail'
+    name: str
+    brand: Optional[str] = None
+    type: Optional[str] = None
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    score: float
+
+@router.get("/", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal['alcohol', 'ingredient', 'cocktail']] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_user_id)
+):
+    """Search a user's alcohol items, ingredients and cocktails by name, brand, type, category and tags
+
+    Query words match whole words, word prefixes, and words a typo or two away.
+    """
+    # Building a user's index on first use reads all three collections
+    return await run_blocking(search_index.search, user_id, q, limit, kind)
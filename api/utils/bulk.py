@@ -0,0 +1,201 @@
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Callable, AsyncIterator, Iterator, Tuple, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from utils.firestore_batch import BatchWriter
+from utils.repository import run_blocking
+from utils.write_events import notify_write
+
+# Rows committed together; each import keeps at most two chunks in memory
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '500'))
+# Row errors listed in an import report; the rest are only counted
+BULK_MAX_ERRORS = int(os.getenv('BULK_MAX_ERRORS', '1000'))
+
+# Adds a validated row's writes to the writer under the given label (the new
+# document id) and returns the document stored
+RowWriter = Callable[[BatchWriter, str, BaseModel], Dict[str, Any]]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, without line endings, as it arrives"""
+    pending = b''
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8-sig')
+    if pending.strip():
+        yield pending.rstrip(b'\r').decode('utf-8-sig')
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, dict) per CSV record, keyed by the header row
+
+    Quoted fields may span lines: a line leaving a quote open is joined
+    with the next one before it is parsed.
+    """
+    header = None
+    record = None
+    row = 0
+    async for line in lines:
+        record = line if record is None else record + '\n' + line
+        if record.count('"') % 2:
+            continue
+        fields = next(csv.reader([record]), [])
+        record = None
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [field.strip() for field in fields]
+            continue
+        row += 1
+        if len(fields) > len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(fields)}")
+            continue
+        # Empty cells are missing values, so optional columns can be left blank
+        yield row, {name: value for name, value in zip(header, fields) if value != ''}
+    if record is not None:
+        yield row + 1, ValueError("Unterminated quoted field")
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, dict) per NDJSON line"""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield row, ValueError(f"Invalid JSON: {e}")
+            continue
+        yield row, value if isinstance(value, dict) else ValueError("Expected a JSON object")
+
+def describe(error: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}" for detail in error.errors()
+    )
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'write_batches': self.batches
+        }
+
+async def import_rows(
+    chunks: AsyncIterator[bytes], format: str, model: Type[BaseModel], write_row: RowWriter,
+    db, collection: str, user_id: str, new_id: Callable[[], str]
+) -> Dict[str, Any]:
+    """Validate CSV or NDJSON rows as they stream in and commit them in batches
+
+    One batch commits while the next chunk of rows is being parsed. Rows
+    that fail validation, or whose batch fails, are reported by row number.
+    """
+    parse = iter_csv_rows if format == 'csv' else iter_ndjson_rows
+    report = ImportReport()
+    writer = BatchWriter(db)
+    rows: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    commit = None
+
+    async def finish(pending):
+        committing_rows, task = pending
+        write_result = await task
+        report.batches += write_result.batches
+        for doc_id in write_result.committed:
+            report.imported += 1
+            notify_write(collection, user_id, doc_id, committing_rows[doc_id][1])
+        for doc_id, error in write_result.failed.items():
+            report.error(committing_rows[doc_id][0], f"Write failed: {error}")
+
+    try:
+        async for row, value in parse(iter_lines(chunks)):
+            if isinstance(value, Exception):
+                report.error(row, str(value))
+                continue
+            try:
+                item = model(**value)
+            except ValidationError as e:
+                report.error(row, describe(e))
+                continue
+
+            doc_id = new_id()
+            try:
+                rows[doc_id] = (row, write_row(writer, doc_id, item))
+            except Exception as e:
+                # A write added before the error would otherwise commit with no row to report it
+                writer.discard(doc_id)
+                report.error(row, str(e) or type(e).__name__)
+                continue
+            if len(rows) >= BULK_CHUNK_SIZE:
+                if commit is not None:
+                    pending, commit = commit, None
+                    await finish(pending)
+                commit = (rows, asyncio.ensure_future(run_blocking(writer.commit)))
+                writer, rows = BatchWriter(db), {}
+    finally:
+        # A batch already sent to the datastore is reported and announced even
+        # if the upload is cut off or fails part way through
+        if commit is not None:
+            await finish(commit)
+    if rows:
+        await finish((rows, asyncio.ensure_future(run_blocking(writer.commit))))
+    return report.result()
+
+def export_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def export_response(query, field_map: Dict[str, str], format: str, filename: str) -> StreamingResponse:
+    """Stream every document of a query as CSV or NDJSON, with response field names
+
+    Documents are written out as they are read, so memory use stays flat
+    however large the collection is.
+    """
+    names = [name for name in field_map if name != 'user_id']
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for doc in query.stream():
+            data = doc.to_dict()
+            yield {'id': doc.id, **{name: export_value(data.get(field_map[name])) for name in names}}
+
+    def lines():
+        buffer = io.StringIO()
+        if format == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=['id', *names], extrasaction='ignore')
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(record):
+                buffer.write(json.dumps(jsonable_encoder(record)) + '\n')
+        for record in records():
+            write(record)
+            # Send roughly 64 KiB at a time rather than a chunk per row
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(lines(), media_type=media_type, headers={
+        'Content-Disposition': f'attachment; filename="{filename}.{format}"'
+    })
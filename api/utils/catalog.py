@@ -0,0 +1,86 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+from utils.product_urls import normalize_product_url
+from utils.firestore_batch import BatchWriter
+
+CATALOG_COLLECTION = 'product_catalog'
+
+# How long a scraped catalog price is reused by per-user refreshes, in seconds
+CATALOG_MAX_AGE = float(os.getenv('CATALOG_MAX_AGE', '900'))
+
+# Firestore allows at most 30 values in an 'in' filter
+IN_QUERY_LIMIT = 30
+
+def catalog_id(product_url: Optional[str]) -> Optional[str]:
+    """The catalog entry a product URL belongs to, the same for every way of writing the URL"""
+    if not product_url:
+        return None
+    return hashlib.sha256(normalize_product_url(product_url).encode()).hexdigest()[:32]
+
+def register(db, product_url: str):
+    """Make sure a product URL has a catalog entry, so catalog refreshes scrape it"""
+    db.collection(CATALOG_COLLECTION).document(catalog_id(product_url)).set({
+        'productUrl': normalize_product_url(product_url)
+    }, merge=True)
+
+def register_in_batch(writer, label: str, db, product_url: str):
+    """Make sure a product URL has a catalog entry, as one of a BatchWriter's writes"""
+    writer.set(label, db.collection(CATALOG_COLLECTION).document(catalog_id(product_url)), {
+        'productUrl': normalize_product_url(product_url)
+    }, merge=True)
+
+def record(writer, db, product_url: str, data: Dict[str, Any], when: datetime):
+    """Store freshly scraped product data on its catalog entry through a BatchWriter"""
+    entry_id = catalog_id(product_url)
+    fields = {key: data[key] for key in ('name', 'price', 'size') if data.get(key) is not None}
+    writer.set(f'catalog:{entry_id}', db.collection(CATALOG_COLLECTION).document(entry_id), {
+        **fields,
+        'productUrl': normalize_product_url(product_url),
+        'lastScraped': when
+    }, merge=True)
+
+def fresh_entries(db, product_urls: List[str], max_age: float = CATALOG_MAX_AGE) -> Dict[str, Dict[str, Any]]:
+    """Catalog data for the product URLs scraped within max_age seconds, by URL as given"""
+    if max_age <= 0 or not product_urls:
+        return {}
+    by_entry: Dict[str, List[str]] = {}
+    for url in product_urls:
+        by_entry.setdefault(catalog_id(url), []).append(url)
+
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    refs = [db.collection(CATALOG_COLLECTION).document(entry_id) for entry_id in by_entry]
+    fresh = {}
+    for snapshot in db.get_all(refs):
+        if not snapshot.exists:
+            continue
+        data = snapshot.to_dict()
+        scraped = data.get('lastScraped')
+        if data.get('price') and scraped is not None and scraped.replace(tzinfo=None) >= cutoff:
+            for url in by_entry[snapshot.id]:
+                fresh[url] = data
+    return fresh
+
+def list_entries(db) -> Dict[str, str]:
+    """Every catalog entry's product URL, by entry id"""
+    return {
+        doc.id: doc.get('productUrl')
+        for doc in db.collection(CATALOG_COLLECTION).select(['productUrl']).stream()
+        if doc.get('productUrl')
+    }
+
+def linked_items(db, entry_ids: List[str]) -> List:
+    """The alcohol item documents of every user linked to the given catalog entries"""
+    docs = []
+    for start in range(0, len(entry_ids), IN_QUERY_LIMIT):
+        chunk = entry_ids[start:start + IN_QUERY_LIMIT]
+        docs.extend(db.collection('alcohol_items').where('catalogId', 'in', chunk).get())
+    return docs
+
+def remove_entries(db, entry_ids: List[str]):
+    """Delete catalog entries no item links to any more, so refreshes stop scraping them"""
+    writer = BatchWriter(db)
+    for entry_id in entry_ids:
+        writer.delete(entry_id, db.collection(CATALOG_COLLECTION).document(entry_id))
+    writer.commit()
@@ -0,0 +1,300 @@
+import json
+import re
+from typing import Optional, Dict, Any, List
+import lxml.html
+from utils.product_urls import normalize_product_url
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text"""
+    return re.sub(r'\s+', ' ', text.strip()) if text else ""
+
+def extract_price(price_text: str) -> Optional[float]:
+    """Extract price from text"""
+    if not price_text:
+        return None
+
+    # Remove currency symbols and extract numbers
+    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
+    if price_match:
+        try:
+            return float(price_match.group().replace(',', ''))
+        except ValueError:
+            return None
+    return None
+
+def extract_volume(text: str) -> Optional[int]:
+    """Extract volume in ml from text"""
+    if not text:
+        return None
+
+    # Look for ml pattern
+    ml_match = re.search(r'(\d+(?:\.\d+)?)\s*ml', text.lower())
+    if ml_match:
+        return int(float(ml_match.group(1)))
+
+    # Look for L pattern and convert to ml
+    l_match = re.search(r'(\d+(?:\.\d+)?)\s*l(?:itre)?', text.lower())
+    if l_match:
+        return int(float(l_match.group(1)) * 1000)
+
+    return None
+
+def extract_alcohol_percentage(text: str) -> Optional[float]:
+    """Extract alcohol percentage from text"""
+    if not text:
+        return None
+
+    # Look for percentage pattern
+    percentage_match = re.search(r'(\d+(?:\.\d+)?)\s*%', text)
+    if percentage_match:
+        return float(percentage_match.group(1))
+
+    return None
+
+# Labels of product attribute rows / spec table entries
+SIZE_LABEL = re.compile(r'size|volume|capacity', re.I)
+ABV_LABEL = re.compile(r'alcohol|abv|strength', re.I)
+
+PRICE_XPATH = "//*[contains(@class, 'price') or contains(@class, 'amount')]"
+ATTRIBUTE_XPATH = (
+    "//li[contains(@class, 'attribute')] | //*[contains(@class, 'attribute')]/li"
+    " | //*[contains(@class, 'spec')]//tr"
+)
+
+# Class names of product tiles on category and search listing pages
+TILE_CLASSES = ('product-tile', 'productTile', 'product-card', 'product-item')
+
+# Whole class tokens only, so BEM children like product-tile__price don't count as tiles
+TILE_XPATH = '//*[' + ' or '.join(
+    f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')" for name in TILE_CLASSES
+) + ']'
+TILE_NAME_XPATH = (
+    ".//*[self::h2 or self::h3 or self::h4 or contains(@class, 'name') or contains(@class, 'title')]"
+)
+
+def json_ld_nodes(tree) -> List[Dict[str, Any]]:
+    """Every object in the page's JSON-LD blocks, including nested @graph entries"""
+    nodes = []
+    for script in tree.xpath("//script[@type='application/ld+json']/text()"):
+        try:
+            payload = json.loads(script)
+        except ValueError:
+            continue
+
+        candidates = payload if isinstance(payload, list) else [payload]
+        while candidates:
+            node = candidates.pop(0)
+            if isinstance(node, dict):
+                nodes.append(node)
+                candidates.extend(node.get('@graph', []))
+    return nodes
+
+def has_type(node: Dict[str, Any], name: str) -> bool:
+    node_type = node.get('@type')
+    return node_type == name or (isinstance(node_type, list) and name in node_type)
+
+def find_product_json_ld(tree) -> Optional[Dict[str, Any]]:
+    """Find the schema.org Product object in the page's JSON-LD blocks"""
+    for node in json_ld_nodes(tree):
+        if has_type(node, 'Product'):
+            return node
+    return None
+
+def first_value(value: Any) -> Any:
+    """Unwrap single-item lists used interchangeably with scalars in JSON-LD"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+def extract_json_ld(tree) -> Dict[str, Any]:
+    """Extract product fields from JSON-LD structured data"""
+    product = find_product_json_ld(tree)
+    if not product:
+        return {}
+
+    data = {'name': clean_text(product.get('name') or '')}
+
+    brand = first_value(product.get('brand'))
+    data['brand'] = brand.get('name') if isinstance(brand, dict) else brand
+
+    image = first_value(product.get('image'))
+    data['image_url'] = image.get('url') if isinstance(image, dict) else image
+
+    offer = first_value(product.get('offers'))
+    if isinstance(offer, dict):
+        price = offer.get('price', offer.get('lowPrice'))
+        data['price'] = extract_price(str(price)) if price is not None else None
+
+    for prop in product.get('additionalProperty') or []:
+        if not isinstance(prop, dict):
+            continue
+        label = str(prop.get('name', ''))
+        value = str(prop.get('value', ''))
+        if SIZE_LABEL.search(label):
+            data['size'] = extract_volume(value)
+        elif ABV_LABEL.search(label):
+            data['alcohol_percentage'] = extract_alcohol_percentage(value)
+
+    return {key: value for key, value in data.items() if value}
+
+def extract_open_graph(tree) -> Dict[str, Any]:
+    """Extract product fields from OpenGraph / product meta tags"""
+    meta = {}
+    for elem in tree.xpath("//meta[@property and @content]"):
+        meta.setdefault(elem.get('property'), elem.get('content'))
+
+    data = {
+        'name': clean_text(meta.get('og:title', '')),
+        'image_url': meta.get('og:image'),
+        'price': extract_price(meta.get('product:price:amount') or meta.get('og:price:amount', '')),
+    }
+    return {key: value for key, value in data.items() if value}
+
+def extract_attributes(tree) -> Dict[str, Any]:
+    """Extract size and alcohol percentage from labelled attribute rows"""
+    data = {}
+    for row in tree.xpath(ATTRIBUTE_XPATH):
+        text = clean_text(row.text_content())
+        if 'size' not in data and SIZE_LABEL.search(text):
+            data['size'] = extract_volume(text)
+        elif 'alcohol_percentage' not in data and ABV_LABEL.search(text):
+            data['alcohol_percentage'] = extract_alcohol_percentage(text)
+    return {key: value for key, value in data.items() if value}
+
+def extract_targeted(tree) -> Dict[str, Any]:
+    """Extract product fields from the product heading and price elements"""
+    data = {}
+
+    heading = tree.xpath('(//h1)[1]') or tree.xpath('(//h2)[1]')
+    if heading:
+        data['name'] = clean_text(heading[0].text_content())
+
+    for elem in tree.xpath(PRICE_XPATH):
+        price_text = clean_text(elem.text_content())
+        if re.search(r'\$\s*\d', price_text):
+            data['price'] = extract_price(price_text)
+            break
+
+    images = tree.xpath("//img[contains(@src, 'product') or contains(@src, 'item')]/@src")
+    if images:
+        data['image_url'] = images[0]
+
+    return {key: value for key, value in data.items() if value}
+
+def extract_product(html: bytes) -> Dict[str, Any]:
+    """Extract product details, preferring structured data over page heuristics"""
+    tree = lxml.html.fromstring(html)
+
+    # Sources in priority order; later ones only fill fields still missing
+    data: Dict[str, Any] = {}
+    for source in (extract_json_ld, extract_open_graph, extract_targeted):
+        for key, value in source(tree).items():
+            data.setdefault(key, value)
+
+    name = data.get('name', '')
+    if not data.get('size'):
+        data['size'] = extract_volume(name)
+    if not data.get('size') or not data.get('alcohol_percentage'):
+        for key, value in extract_attributes(tree).items():
+            if not data.get(key):
+                data[key] = value
+
+    # Last resort: the old whole-page text heuristics
+    if not data.get('size') or not data.get('alcohol_percentage') or not data.get('price'):
+        page_text = name + " " + tree.text_content()
+        if not data.get('size'):
+            data['size'] = extract_volume(page_text)
+        if not data.get('alcohol_percentage'):
+            data['alcohol_percentage'] = extract_alcohol_percentage(page_text)
+        if not data.get('price'):
+            price_match = re.search(r'\$\s*[\d,]+(?:\.\d+)?', page_text)
+            data['price'] = extract_price(price_match.group()) if price_match else None
+
+    return {
+        'name': name,
+        'brand': data.get('brand') or (name.split()[0] if name else ""),
+        'price': data.get('price'),
+        'size': data.get('size'),
+        'alcohol_percentage': data.get('alcohol_percentage'),
+        'image_url': data.get('image_url')
+    }
+
+def offer_price(product: Dict[str, Any]) -> Optional[float]:
+    offer = first_value(product.get('offers'))
+    if not isinstance(offer, dict):
+        return None
+    price = offer.get('price', offer.get('lowPrice'))
+    return extract_price(str(price)) if price is not None else None
+
+def extract_listing_json_ld(tree, base_url: str) -> List[Dict[str, Any]]:
+    """Tiles from schema.org ItemList structured data"""
+    tiles = []
+    for node in json_ld_nodes(tree):
+        if not has_type(node, 'ItemList'):
+            continue
+        for element in node.get('itemListElement') or []:
+            if not isinstance(element, dict):
+                continue
+            product = element.get('item') if isinstance(element.get('item'), dict) else element
+            url = product.get('url') or element.get('url')
+            if not url:
+                continue
+            name = clean_text(product.get('name') or '')
+            tiles.append({
+                'product_url': normalize_product_url(url, base_url),
+                'name': name,
+                'price': offer_price(product),
+                'size': extract_volume(name)
+            })
+    return tiles
+
+def extract_listing_tiles(tree, base_url: str) -> List[Dict[str, Any]]:
+    """Tiles from product tile markup"""
+    elements = tree.xpath(TILE_XPATH)
+    # Tiles nested in a larger tile-like wrapper: keep the innermost
+    inner = set(elements)
+    for element in elements:
+        for ancestor in element.iterancestors():
+            inner.discard(ancestor)
+
+    tiles = []
+    for element in elements:
+        if element not in inner:
+            continue
+        links = element.xpath(".//a[@href]")
+        if not links:
+            continue
+        link = next((a for a in links if 'product' in a.get('href')), links[0])
+
+        headings = element.xpath(TILE_NAME_XPATH)
+        name = clean_text((headings[0] if headings else link).text_content())
+
+        price = None
+        for price_elem in element.xpath(".//*[contains(@class, 'price') or contains(@class, 'amount')]"):
+            price_text = clean_text(price_elem.text_content())
+            if re.search(r'\$\s*\d', price_text):
+                price = extract_price(price_text)
+                break
+
+        tiles.append({
+            'product_url': normalize_product_url(link.get('href'), base_url),
+            'name': name,
+            'price': price,
+            'size': extract_volume(name) or extract_volume(clean_text(element.text_content()))
+        })
+    return tiles
+
+def extract_listing(html: bytes, base_url: str = '') -> List[Dict[str, Any]]:
+    """Extract name, price, size and product URL for every product tile on a
+    category or search listing page, keyed by normalized product URL"""
+    tree = lxml.html.fromstring(html)
+
+    # Structured data first; tile markup fills in missing fields and tiles
+    tiles: Dict[str, Dict[str, Any]] = {}
+    for source in (extract_listing_json_ld, extract_listing_tiles):
+        for tile in source(tree, base_url):
+            existing = tiles.setdefault(tile['product_url'], tile)
+            for key, value in tile.items():
+                if not existing.get(key):
+                    existing[key] = value
+    return list(tiles.values())
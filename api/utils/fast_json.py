@@ -0,0 +1,62 @@
+import json
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Opt-in: list routes map stored documents straight to the response schema and
+# encode them in one pass, instead of building and re-validating response models
+FAST_RESPONSES = os.getenv('FAST_RESPONSES', '0') == '1'
+
+# (document id, document data) pairs, as returned by get_user_documents
+Documents = List[Tuple[str, Dict[str, Any]]]
+
+def encode_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Firestore timestamps are a datetime subclass orjson won't encode itself
+        return datetime(*value.timetuple()[:6], value.microsecond, value.tzinfo)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def stdlib_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(value: Any) -> bytes:
+    """Encode to JSON bytes the way the response models would, datetimes in UTC as ...Z"""
+    if orjson is not None:
+        return orjson.dumps(value, default=encode_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=stdlib_default, separators=(',', ':')).encode()
+
+def serializer(field_map: Dict[str, str], floats: Tuple[str, ...] = (), defaults: Optional[Dict[str, Any]] = None):
+    """Serializer mapping a stored document's camelCase fields to response field names
+
+    Values are passed through unvalidated, except that fields the response
+    model declares as float are coerced so whole numbers still encode as 3.0.
+    """
+    items = list(field_map.items())
+    defaults = defaults or {}
+
+    def serialize(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        row = {'id': doc_id}
+        for name, field in items:
+            row[name] = data.get(field, defaults.get(name))
+        for name in floats:
+            if isinstance(row[name], int):
+                row[name] = float(row[name])
+        return row
+    return serialize
+
+def fast_list_response(docs: Documents, serialize, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response of serialized documents, bypassing response model validation"""
+    return Response(
+        dumps([serialize(doc_id, data) for doc_id, data in docs]),
+        media_type='application/json',
+        headers=headers
+    )
@@ -1,11 +1,13 @@
 import os
 import json
-from firebase_admin import credentials, firestore, initialize_app
 
 # Initialize Firebase Admin
 def initialize_firebase():
     """Initialize Firebase Admin SDK"""
-    if not hasattr(initialize_firebase, 'initialized'):
+    if not hasattr(initialize_firebase, 'client'):
+        # Imported here so cold starts that never touch Firestore skip firebase_admin
+        from firebase_admin import credentials, firestore, initialize_app
+        
         # Check if running in Vercel environment
         if os.getenv('VERCEL'):
             # Use environment variables in production
@@ -27,10 +29,51 @@ def initialize_firebase():
             cred = credentials.Certificate('../firebase-config.json')
         
         initialize_app(cred)
-        initialize_firebase.initialized = True
+        initialize_firebase.client = firestore.client()
     
-    return firestore.client()
+    return initialize_firebase.client
+
+def get_memory_client():
+    """Get the process-wide in-memory client (STORAGE_BACKEND=memory)"""
+    if not hasattr(get_memory_client, 'client'):
+        from utils.memory_store import MemoryClient
+        get_memory_client.client = MemoryClient()
+    return get_memory_client.client
+
+def get_sqlite_client():
+    """Get the process-wide SQLite client (STORAGE_BACKEND=sqlite, file at SQLITE_PATH)"""
+    if not hasattr(get_sqlite_client, 'client'):
+        from utils.sqlite_store import SqliteClient
+        get_sqlite_client.client = SqliteClient()
+    return get_sqlite_client.client
+
+def get_emulator_client():
+    """Get a client for the Firestore emulator at FIRESTORE_EMULATOR_HOST"""
+    if not hasattr(get_emulator_client, 'client'):
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud.firestore import Client
+        get_emulator_client.client = Client(
+            project=os.getenv('FIREBASE_PROJECT_ID', 'demo-bar-price-tracker'),
+            credentials=AnonymousCredentials()
+        )
+    return get_emulator_client.client
+
+def get_raw_client():
+    """Get the configured datastore client, without instrumentation"""
+    backend = os.getenv('STORAGE_BACKEND', 'firestore')
+    if backend == 'memory':
+        return get_memory_client()
+    if backend == 'sqlite':
+        return get_sqlite_client()
+    if os.getenv('FIRESTORE_EMULATOR_HOST'):
+        return get_emulator_client()
+    return initialize_firebase()
 
 def get_firestore_client():
-    """Get Firestore client instance"""
-    return initialize_firebase()
\ No newline at end of file
+    """Get Firestore client instance, counting reads, writes and queries for /metrics"""
+    client = get_raw_client()
+    wrapped = getattr(get_firestore_client, 'wrapped', None)
+    if wrapped is None or wrapped._client is not client:
+        from utils.instrumented_client import InstrumentedClient
+        wrapped = get_firestore_client.wrapped = InstrumentedClient(client)
+    return wrapped
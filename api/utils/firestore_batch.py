@@ -0,0 +1,80 @@
+from typing import Dict, Any, List, Tuple
+
+# Firestore rejects batched writes with more than 500 operations
+MAX_BATCH_OPERATIONS = 500
+
+class BatchResult:
+    """Outcome of a BatchWriter commit, by the label each write was added under"""
+
+    def __init__(self):
+        self.committed: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.batches = 0
+
+class BatchWriter:
+    """Collect Firestore writes and commit them in batches of up to 500 operations
+
+    Writes are grouped by label (e.g. the item they belong to); a group is
+    never split across batches, so an item's writes land or fail together
+    and failures can be reported per item.
+    """
+
+    def __init__(self, db, max_operations: int = MAX_BATCH_OPERATIONS):
+        self.db = db
+        self.max_operations = max_operations
+        self.groups: Dict[str, List[Tuple[str, Any, Any]]] = {}
+
+    def set(self, label: str, reference, data: Dict[str, Any], merge: bool = False):
+        self.groups.setdefault(label, []).append(('set', reference, (data, merge)))
+
+    def update(self, label: str, reference, data: Dict[str, Any]):
+        self.groups.setdefault(label, []).append(('update', reference, data))
+
+    def delete(self, label: str, reference):
+        self.groups.setdefault(label, []).append(('delete', reference, None))
+
+    def discard(self, label: str):
+        """Drop the writes added under a label, before they are committed"""
+        self.groups.pop(label, None)
+
+    def __len__(self) -> int:
+        return sum(len(operations) for operations in self.groups.values())
+
+    def _chunks(self):
+        """Split the groups into chunks that each fit in one batch"""
+        chunk, size = [], 0
+        for label, operations in self.groups.items():
+            if chunk and size + len(operations) > self.max_operations:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((label, operations))
+            size += len(operations)
+        if chunk:
+            yield chunk
+
+    def commit(self) -> BatchResult:
+        """Commit all collected writes, one batch per chunk"""
+        result = BatchResult()
+
+        for chunk in self._chunks():
+            batch = self.db.batch()
+            for _, operations in chunk:
+                for kind, reference, data in operations:
+                    if kind == 'set':
+                        batch.set(reference, data[0], merge=data[1])
+                    elif kind == 'update':
+                        batch.update(reference, data)
+                    else:
+                        batch.delete(reference)
+
+            labels = [label for label, _ in chunk]
+            try:
+                batch.commit()
+                result.committed.extend(labels)
+            except Exception as e:
+                for label in labels:
+                    result.failed[label] = str(e)
+            result.batches += 1
+
+        self.groups = {}
+        return result
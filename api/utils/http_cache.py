@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Tuple
+from fastapi import Depends, HTTPException, Request, Response
+from utils.session import get_user_id
+from utils.write_events import on_write
+
+# How long a collection version is trusted without a write through this
+# process; bounds how stale a 304 can be when another instance wrote
+COLLECTION_VERSION_TTL = float(os.getenv('COLLECTION_VERSION_TTL', os.getenv('LIST_CACHE_TTL', '60')))
+
+class CollectionVersions:
+    """Per-user collection version counters, bumped by every committed write
+
+    Versions live in process memory, so checking one never touches the
+    datastore. Each process starts from its own random epoch, and a version
+    not bumped for ttl seconds is bumped anyway, so tags from a restarted or
+    different instance never match stale data for long.
+    """
+
+    def __init__(self, ttl: float = COLLECTION_VERSION_TTL):
+        self.ttl = ttl
+        self.epoch = uuid.uuid4().hex
+        self.versions: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self.lock = threading.Lock()
+
+    def current(self, collection: str, user_id: str) -> int:
+        key = (collection, user_id)
+        now = time.monotonic()
+        with self.lock:
+            version, expires = self.versions.get(key, (0, 0.0))
+            if expires <= now:
+                version += 1
+                self.versions[key] = (version, now + self.ttl)
+            return version
+
+    def bump(self, collection: str, user_id: str):
+        key = (collection, user_id)
+        with self.lock:
+            version = self.versions.get(key, (0, 0.0))[0] + 1
+            self.versions[key] = (version, time.monotonic() + self.ttl)
+
+    def etag(self, collection: str, user_id: str) -> str:
+        """Weak ETag for a user's collection, so it survives response compression"""
+        version = self.current(collection, user_id)
+        digest = hashlib.sha256(f'{self.epoch}:{collection}:{user_id}:{version}'.encode()).hexdigest()[:24]
+        return f'W/"{digest}"'
+
+collection_versions = CollectionVersions()
+
+@on_write
+def bump_version(collection: str, user_id: str, doc_id: str, data):
+    collection_versions.bump(collection, user_id)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in tags}
+
+def collection_etag(collection: str):
+    """Dependency answering 304 Not Modified when the client's copy is current
+
+    Otherwise returns the cache headers to send, already set on responses
+    built from the route's return value; routes returning a Response
+    themselves must add them.
+    """
+    def check(request: Request, response: Response, user_id: str = Depends(get_user_id)) -> Dict[str, str]:
+        headers = {'ETag': collection_versions.etag(collection, user_id), 'Cache-Control': 'private, no-cache'}
+        if etag_matches(request.headers.get('if-none-match', ''), headers['ETag']):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return headers
+    return check
@@ -0,0 +1,312 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, Optional, Any
+from urllib.parse import urlparse
+import httpx
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+REQUEST_TIMEOUT = float(os.getenv('SCRAPER_TIMEOUT', '10'))
+
+# Default number of in-flight requests per retailer host
+DEFAULT_HOST_CONCURRENCY = int(os.getenv('SCRAPER_HOST_CONCURRENCY', '8'))
+
+def parse_host_limits(value: str, cast=int) -> Dict[str, Any]:
+    """Parse per-host limits, e.g. 'bws.com.au=4,liquorland.com.au=6'"""
+    limits = {}
+    for entry in value.split(','):
+        if '=' not in entry:
+            continue
+        host, limit = entry.split('=', 1)
+        limits[host.strip().lower()] = cast(limit)
+    return limits
+
+HOST_CONCURRENCY = parse_host_limits(os.getenv('SCRAPER_HOST_LIMITS', ''))
+
+# Requests per second each host may receive (0 for no limit), and the burst allowed above it
+DEFAULT_HOST_RATE = float(os.getenv('SCRAPER_HOST_RATE', '0'))
+HOST_RATES = parse_host_limits(os.getenv('SCRAPER_HOST_RATES', 'bws.com.au=10,liquorland.com.au=10'), float)
+HOST_BURST = int(os.getenv('SCRAPER_HOST_BURST', '5'))
+
+# Retries for connection errors, timeouts, 429s and 5xx responses
+MAX_RETRIES = int(os.getenv('SCRAPER_RETRIES', '3'))
+RETRY_BASE_SECONDS = float(os.getenv('SCRAPER_RETRY_BASE', '0.5'))
+RETRY_MAX_SECONDS = float(os.getenv('SCRAPER_RETRY_MAX', '10'))
+
+# Consecutive failures that open a host's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv('SCRAPER_BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('SCRAPER_BREAKER_RESET', '30'))
+
+# A response this many times slower than the host's average counts as congestion
+LATENCY_SPIKE_FACTOR = float(os.getenv('SCRAPER_LATENCY_SPIKE', '3'))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit breaker is open"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+class TokenBucket:
+    """Spaces requests to rate per second, allowing bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while self.rate > 0:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AdaptiveLimit:
+    """Concurrency limit that grows by one per limit's worth of good responses
+    and halves on 429s, 5xx responses, errors and latency spikes"""
+
+    def __init__(self, maximum: int):
+        self.maximum = maximum
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.samples = 0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def cancel(self):
+        """Give back a slot that was never used for a request"""
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def release(self, seconds: float, congested: bool):
+        async with self.condition:
+            self.in_flight -= 1
+            spike = (
+                self.samples >= 5 and self.latency is not None and seconds > self.latency * LATENCY_SPIKE_FACTOR
+            )
+            if not congested:
+                # Average of normal latencies, the baseline spikes are measured against
+                self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+                self.samples += 1
+
+            now = time.monotonic()
+            if congested or spike:
+                # Back off at most once per round trip, so one slow burst only halves once
+                if now - self.last_decrease > (self.latency or 0):
+                    self.limit = max(1.0, self.limit / 2)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+class CircuitBreaker:
+    """Opens after BREAKER_FAILURES consecutive failures, failing fast until
+    BREAKER_RESET_SECONDS have passed; then lets one trial request through
+    (or another, if the trial is abandoned for that long)"""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return 'open'
+        return 'half_open'
+
+    def check(self, host: str):
+        state = self.state
+        now = time.monotonic()
+        trial_running = self.trial_started is not None and now - self.trial_started < self.reset_seconds
+        if state == 'open' or (state == 'half_open' and trial_running):
+            raise CircuitOpenError(host, max(0.0, self.opened_at + self.reset_seconds - now))
+        if state == 'half_open':
+            self.trial_started = now
+
+    def record(self, success: bool):
+        self.trial_started = None
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+class HostScheduler:
+    """Rate, concurrency and circuit state for one retailer host"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = TokenBucket(get_host_rate(host), HOST_BURST)
+        self.limit = AdaptiveLimit(get_host_concurrency(host))
+        self.breaker = CircuitBreaker()
+        self.counters = {'requests': 0, 'retries': 0, 'throttled': 0, 'server_errors': 0, 'errors': 0, 'rejected': 0}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit.limit),
+            'in_flight': self.limit.in_flight,
+            'latency_ms': round(self.limit.latency * 1000, 1) if self.limit.latency is not None else None,
+            'circuit': self.breaker.state,
+            'circuit_trips': self.breaker.trips,
+            **self.counters
+        }
+
+# Pooled connections are bound to the event loop that opened them
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_clients: Dict[str, httpx.AsyncClient] = {}
+_schedulers: Dict[str, HostScheduler] = {}
+
+def _check_loop():
+    """Drop pools created under a different (e.g. already closed) event loop"""
+    global _loop
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        _clients.clear()
+        _schedulers.clear()
+        _loop = loop
+
+def get_host(url: str) -> str:
+    """Get the host a URL points at, without any www. prefix"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+def host_setting(host: str, settings: Dict[str, Any], default):
+    for suffix, value in settings.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return value
+    return default
+
+def get_host_concurrency(host: str) -> int:
+    """Get the concurrency limit for a host"""
+    return host_setting(host, HOST_CONCURRENCY, DEFAULT_HOST_CONCURRENCY)
+
+def get_host_rate(host: str) -> float:
+    """Get the requests per second allowed to a host"""
+    return host_setting(host, HOST_RATES, DEFAULT_HOST_RATE)
+
+def get_client(host: str) -> httpx.AsyncClient:
+    """Get the pooled keep-alive client for a host"""
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        concurrency = get_host_concurrency(host)
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=concurrency
+            )
+        )
+        _clients[host] = client
+    return client
+
+def get_scheduler(host: str) -> HostScheduler:
+    """Get the rate limiter, adaptive limit and circuit breaker for a host"""
+    scheduler = _schedulers.get(host)
+    if scheduler is None:
+        scheduler = _schedulers[host] = HostScheduler(host)
+    return scheduler
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when it sends one"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_SECONDS)
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+async def fetch(url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """GET a URL through its host's pooled client
+
+    Requests are spaced by the host's token bucket and bounded by its
+    adaptive concurrency limit. Connection errors, timeouts, 429s and 5xx
+    responses are retried with jittered exponential backoff; the last
+    response is returned (or error raised) once retries run out. A host
+    that keeps failing has its circuit opened, and fetches to it raise
+    CircuitOpenError without touching the network.
+    """
+    _check_loop()
+    host = get_host(url)
+    scheduler = get_scheduler(host)
+    for attempt in range(MAX_RETRIES + 1):
+        await scheduler.limit.acquire()
+        # Checked once a slot is free, so queued fetches fail fast once the circuit opens
+        try:
+            scheduler.breaker.check(host)
+        except CircuitOpenError:
+            scheduler.counters['rejected'] += 1
+            await scheduler.limit.cancel()
+            raise
+        await scheduler.bucket.acquire()
+        scheduler.counters['requests'] += 1
+        started = time.monotonic()
+        response = None
+        error = None
+        try:
+            response = await get_client(host).get(url, headers=headers)
+        except httpx.TransportError as e:
+            error = e
+        finally:
+            failed = error is not None or response is None or response.status_code in RETRY_STATUSES
+            await scheduler.limit.release(time.monotonic() - started, congested=failed)
+            # A 429 means slow down, not that the host is down
+            scheduler.breaker.record(response is not None and response.status_code < 500)
+        
+        if not failed:
+            return response
+        if error is not None:
+            scheduler.counters['errors'] += 1
+        elif response.status_code == 429:
+            scheduler.counters['throttled'] += 1
+        else:
+            scheduler.counters['server_errors'] += 1
+        if attempt == MAX_RETRIES:
+            break
+        scheduler.counters['retries'] += 1
+        await asyncio.sleep(retry_delay(attempt, response))
+
+    if error is not None:
+        raise error
+    return response
+
+def host_stats() -> Dict[str, Dict[str, Any]]:
+    """Get each host's current limit, circuit state and request counters"""
+    return {host: scheduler.stats() for host, scheduler in _schedulers.items()}
+
+async def close_clients():
+    """Close all pooled clients (their connections are bound to the running loop)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    _schedulers.clear()
+    for client in clients:
+        await client.aclose()
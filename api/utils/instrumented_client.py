@@ -0,0 +1,125 @@
+from typing import Any
+from utils.metrics import record_datastore
+
+def unwrap(reference):
+    """The underlying client's reference, for passing back into the client"""
+    return getattr(reference, '_reference', reference)
+
+class InstrumentedDocument:
+    """Document reference that counts reads and writes"""
+
+    def __init__(self, reference):
+        self._reference = reference
+
+    def get(self, *args, **kwargs):
+        record_datastore('read')
+        return self._reference.get(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        record_datastore('write')
+        return self._reference.set(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        record_datastore('write')
+        return self._reference.update(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        record_datastore('write')
+        return self._reference.delete(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._reference, name)
+
+class InstrumentedQuery:
+    """Collection reference or query that counts query executions and the documents they read"""
+
+    def __init__(self, query):
+        self._query = query
+
+    def _chain(self, method: str, *args, **kwargs) -> 'InstrumentedQuery':
+        return InstrumentedQuery(getattr(self._query, method)(*args, **kwargs))
+
+    def where(self, *args, **kwargs):
+        return self._chain('where', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._chain('order_by', *args, **kwargs)
+
+    def start_after(self, *args, **kwargs):
+        return self._chain('start_after', *args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        return self._chain('select', *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._chain('limit', *args, **kwargs)
+
+    def document(self, *args, **kwargs):
+        return InstrumentedDocument(self._query.document(*args, **kwargs))
+
+    def add(self, *args, **kwargs):
+        record_datastore('write')
+        return self._query.add(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        record_datastore('query')
+        docs = self._query.get(*args, **kwargs)
+        record_datastore('read', len(docs))
+        return docs
+
+    def stream(self, *args, **kwargs):
+        record_datastore('query')
+        for doc in self._query.stream(*args, **kwargs):
+            record_datastore('read')
+            yield doc
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._query, name)
+
+class InstrumentedBatch:
+    """Write batch that counts its operations as writes when committed"""
+
+    def __init__(self, batch):
+        self._batch = batch
+        self._operations = 0
+
+    def set(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._batch.set(unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._batch.update(unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._batch.delete(unwrap(reference), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        record_datastore('write', self._operations)
+        self._operations = 0
+        return self._batch.commit(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._batch, name)
+
+class InstrumentedClient:
+    """Wraps a Firestore (or compatible) client to count the reads, writes and
+    queries made through it, for the per-request datastore metrics"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, *args, **kwargs):
+        return InstrumentedQuery(self._client.collection(*args, **kwargs))
+
+    def batch(self, *args, **kwargs):
+        return InstrumentedBatch(self._client.batch(*args, **kwargs))
+
+    def get_all(self, references, *args, **kwargs):
+        references = [unwrap(reference) for reference in references]
+        record_datastore('read', len(references))
+        return self._client.get_all(references, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
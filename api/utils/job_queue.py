@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, List
+
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', '/tmp/bar-price-tracker/jobs.sqlite3')
+
+# A running job whose worker has not renewed its lease for this long is taken over
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    item_ids TEXT,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_count INTEGER NOT NULL DEFAULT 0,
+    errors TEXT NOT NULL DEFAULT '[]',
+    worker_id TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+class JobQueue:
+    """SQLite-backed queue of chunked jobs with checkpoints
+
+    A job records the ids of the items it covers and how many of them are
+    done. Workers claim a job with a lease, renew it with heartbeats while
+    they work, and checkpoint after every chunk, so a job whose worker dies is picked up
+    by another worker once the lease expires and resumes from the last
+    checkpoint rather than from the start.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def submit(self, kind: str, user_id: str) -> str:
+        """Queue a job and return its id"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, user_id, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, user_id, 'queued', now, now)
+        )
+        return job_id
+
+    def claim(self, kind: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Claim the oldest queued job, or a running one whose lease expired"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND (status = 'queued' OR (status = 'running' AND heartbeat_at < ?))"
+                " ORDER BY created_at LIMIT 1",
+                (kind, now - self.lease_seconds)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now, now, row['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return self.get(row['id'])
+
+    def set_items(self, job_id: str, worker_id: str, item_ids: List[str]) -> bool:
+        """Record the items a job covers; False if the worker lost its lease"""
+        now = time.time()
+        cursor = self._connect().execute(
+            'UPDATE jobs SET item_ids = ?, total = ?, heartbeat_at = ?, updated_at = ? WHERE id = ? AND worker_id = ?',
+            (json.dumps(item_ids), len(item_ids), now, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Renew a running job's lease; False if the worker lost it"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+            (now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def checkpoint(self, job_id: str, worker_id: str, done: int, updated_count: int, errors: List[str]) -> bool:
+        """Save progress after a chunk; False if the worker lost its lease"""
+        now = time.time()
+        cursor = self._connect().execute(
+            'UPDATE jobs SET done = ?, updated_count = ?, errors = ?, heartbeat_at = ?, updated_at = ?'
+            ' WHERE id = ? AND worker_id = ?',
+            (done, updated_count, json.dumps(errors), now, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, worker_id: str, status: str, error: Optional[str] = None):
+        """Mark a job done or failed"""
+        conn = self._connect()
+        now = time.time()
+        if error:
+            job = self.get(job_id)
+            errors = job['errors'] + [error] if job else [error]
+            conn.execute('UPDATE jobs SET errors = ? WHERE id = ? AND worker_id = ?',
+                         (json.dumps(errors), job_id, worker_id))
+        conn.execute(
+            'UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND worker_id = ?',
+            (status, now, job_id, worker_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's state"""
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['item_ids'] = json.loads(job['item_ids']) if job['item_ids'] else None
+        job['errors'] = json.loads(job['errors'])
+        return job
+
+job_queue = JobQueue()
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+from utils.firebase_utils import get_firestore_client
+from utils.write_events import on_write
+
+LIST_CACHE_TTL = float(os.getenv('LIST_CACHE_TTL', '60'))
+LIST_CACHE_MAX_BYTES = int(os.getenv('LIST_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# (document id, document data) pairs, as returned by get_user_documents
+Documents = List[Tuple[str, Dict[str, Any]]]
+
+def estimate_size(docs: Documents) -> int:
+    """Approximate the memory held by a cached listing"""
+    return len(json.dumps(docs, default=str))
+
+class ListCache:
+    """Per-user collection listings with a TTL and an LRU memory bound
+
+    Entries are keyed by (collection, user_id) and dropped by invalidate()
+    whenever this process writes to that user's collection. Each key has a
+    generation counter so a read that started before a write cannot store
+    its now-stale result after the invalidation.
+    """
+
+    def __init__(self, ttl: float = LIST_CACHE_TTL, max_bytes: int = LIST_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.generations: Dict[Tuple[str, str], int] = {}
+        self.bytes = 0
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+
+    def generation(self, collection: str, user_id: str) -> int:
+        return self.generations.get((collection, user_id), 0)
+
+    def get(self, collection: str, user_id: str) -> Optional[Documents]:
+        key = (collection, user_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.counters['misses'] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry[2]
+
+    def put(self, collection: str, user_id: str, docs: Documents, generation: int):
+        key = (collection, user_id)
+        size = estimate_size(docs)
+        with self.lock:
+            if generation != self.generation(collection, user_id) or size > self.max_bytes:
+                return
+
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, size, docs)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.counters['evictions'] += 1
+
+    def invalidate(self, collection: str, user_id: str):
+        key = (collection, user_id)
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            self._remove(key)
+            self.counters['invalidations'] += 1
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio and memory use"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_ratio': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl
+        }
+
+list_cache = ListCache()
+
+@on_write
+def invalidate_listing(collection: str, user_id: str, doc_id: str, data):
+    list_cache.invalidate(collection, user_id)
+
+def load_user_documents(collection: str, user_id: str) -> Documents:
+    """Read a user's documents in a collection from the datastore and cache them"""
+    generation = list_cache.generation(collection, user_id)
+    db = get_firestore_client()
+    query = db.collection(collection).where('userId', '==', user_id).get()
+    docs = [(doc.id, doc.to_dict()) for doc in query]
+    list_cache.put(collection, user_id, docs, generation)
+    return docs
+
+def get_user_documents(collection: str, user_id: str) -> Documents:
+    """Get a user's documents in a collection, through the list cache"""
+    docs = list_cache.get(collection, user_id)
+    if docs is None:
+        docs = load_user_documents(collection, user_id)
+    return docs
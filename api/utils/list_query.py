@@ -0,0 +1,62 @@
+import json
+from typing import Optional, Dict, Any, List, Callable
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from utils import fast_json
+
+MAX_PAGE_SIZE = 1000
+
+def parse_fields(fields: Optional[str], field_map: Dict[str, str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= projection into response field names"""
+    if fields is None:
+        return None
+
+    names = [name.strip() for name in fields.split(',') if name.strip() and name.strip() != 'id']
+    unknown = [name for name in names if name not in field_map]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def build_list_query(db, collection: str, user_id: str, limit: Optional[int], cursor: Optional[str],
+                     fields: Optional[List[str]], field_map: Dict[str, str]):
+    """Build a user's list query ordered by document id, paged with start_after"""
+    query = db.collection(collection).where('userId', '==', user_id).order_by('__name__')
+    if fields is not None:
+        query = query.select([field_map[name] for name in fields])
+    if cursor:
+        query = query.start_after({'__name__': cursor})
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def project(fields: List[str], field_map: Dict[str, str]) -> Callable[[str, Dict[str, Any]], Dict[str, Any]]:
+    """Serializer returning only the requested response fields of a document"""
+    def serialize(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {'id': doc_id, **{name: data.get(field_map[name]) for name in fields}}
+    return serialize
+
+def list_response(query, serialize: Callable[[str, Dict[str, Any]], Any], limit: Optional[int], stream: bool,
+                  headers: Optional[Dict[str, str]] = None):
+    """Respond with a page of query results, as JSON or streamed NDJSON
+
+    JSON pages carry the cursor for the next page in X-Next-Cursor; NDJSON
+    clients page by passing the id of the last line they received.
+    """
+    if stream:
+        def lines():
+            for doc in query.stream():
+                if fast_json.FAST_RESPONSES:
+                    yield fast_json.dumps(serialize(doc.id, doc.to_dict())) + b'\n'
+                else:
+                    yield json.dumps(jsonable_encoder(serialize(doc.id, doc.to_dict()))) + '\n'
+        return StreamingResponse(lines(), media_type='application/x-ndjson', headers=headers)
+
+    docs = query.get()
+    headers = dict(headers or {})
+    if limit and len(docs) == limit:
+        headers['X-Next-Cursor'] = docs[-1].id
+    if fast_json.FAST_RESPONSES:
+        return fast_json.fast_list_response([(doc.id, doc.to_dict()) for doc in docs], serialize, headers)
+    body = [serialize(doc.id, doc.to_dict()) for doc in docs]
+    return JSONResponse(jsonable_encoder(body), headers=headers)
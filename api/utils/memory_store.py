@@ -0,0 +1,292 @@
+import copy
+import os
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, List
+
+class NotFound(Exception):
+    """Raised when updating a document that does not exist"""
+
+OPERATORS = {
+    '==': lambda value, target: value == target,
+    '!=': lambda value, target: value is not None and value != target,
+    '<': lambda value, target: value is not None and value < target,
+    '<=': lambda value, target: value is not None and value <= target,
+    '>': lambda value, target: value is not None and value > target,
+    '>=': lambda value, target: value is not None and value >= target,
+    'in': lambda value, target: value in target,
+    'not-in': lambda value, target: value is not None and value not in target,
+    'array-contains': lambda value, target: isinstance(value, list) and target in value,
+    'array-contains-any': lambda value, target: isinstance(value, list) and any(v in value for v in target),
+}
+
+def resolve_value(current: Any, value: Any) -> Any:
+    """Apply Firestore field transforms (ArrayUnion, ArrayRemove, Increment)"""
+    transform = type(value).__name__
+    if transform == 'ArrayUnion':
+        result = list(current) if isinstance(current, list) else []
+        return result + [item for item in value.values if item not in result]
+    if transform == 'ArrayRemove':
+        return [item for item in current if item not in value.values] if isinstance(current, list) else []
+    if transform == 'Increment':
+        return current + value.value if isinstance(current, (int, float)) else value.value
+    return copy.deepcopy(value)
+
+def merge_fields(target: Dict[str, Any], data: Dict[str, Any]):
+    """Merge data into target, recursing into maps like set(..., merge=True)"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_fields(target[key], value)
+        else:
+            target[key] = resolve_value(target.get(key), value)
+
+class DocumentSnapshot:
+    def __init__(self, reference: 'DocumentReference', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+class DocumentReference:
+    def __init__(self, client: 'MemoryClient', collection: str, doc_id: str):
+        self._client = client
+        self.collection_name = collection
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f'{self.collection_name}/{self.id}'
+
+    def get(self) -> DocumentSnapshot:
+        self._client.round_trip()
+        return self._get()
+
+    def _get(self) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self._client.read(self.collection_name, self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._client.round_trip()
+        self._set(data, merge)
+
+    def _set(self, data: Dict[str, Any], merge: bool = False):
+        with self._client.transaction():
+            current = self._client.read(self.collection_name, self.id) if merge else None
+            target = current if current is not None else {}
+            merge_fields(target, data)
+            self._client.write(self.collection_name, self.id, target)
+
+    def update(self, data: Dict[str, Any]):
+        self._client.round_trip()
+        self._update(data)
+
+    def _update(self, data: Dict[str, Any]):
+        with self._client.transaction():
+            current = self._client.read(self.collection_name, self.id)
+            if current is None:
+                raise NotFound(f'No document to update: {self.path}')
+            for key, value in data.items():
+                current[key] = resolve_value(current.get(key), value)
+            self._client.write(self.collection_name, self.id, current)
+
+    def delete(self):
+        self._client.round_trip()
+        self._delete()
+
+    def _delete(self):
+        self._client.write(self.collection_name, self.id, None)
+
+class Query:
+    def __init__(self, client: 'MemoryClient', collection: str, **options):
+        self._client = client
+        self._collection = collection
+        self._filters = options.get('filters', [])
+        self._orders = options.get('orders', [])
+        self._start_after = options.get('start_after')
+        self._fields = options.get('fields')
+        self._limit = options.get('limit')
+
+    def _copy(self, **changes) -> 'Query':
+        options = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'start_after': self._start_after,
+            'fields': self._fields,
+            'limit': self._limit,
+        }
+        options.update(changes)
+        return Query(self._client, self._collection, **options)
+
+    def where(self, field: str, op: str, value: Any) -> 'Query':
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field: str, direction: str = 'ASCENDING') -> 'Query':
+        return self._copy(orders=self._orders + [(field, direction == 'DESCENDING')])
+
+    def start_after(self, document_fields) -> 'Query':
+        if isinstance(document_fields, DocumentSnapshot):
+            document_fields = dict(document_fields.to_dict(), __name__=document_fields.id)
+        return self._copy(start_after=document_fields)
+
+    def select(self, field_paths: List[str]) -> 'Query':
+        return self._copy(fields=list(field_paths))
+
+    def limit(self, count: int) -> 'Query':
+        return self._copy(limit=count)
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        return all(OPERATORS[op](data.get(field), value) for field, op, value in self._filters)
+
+    def _sort_value(self, doc_id: str, data: Dict[str, Any], field: str):
+        value = doc_id if field == '__name__' else data.get(field)
+        # None sorts first, as in Firestore
+        return (value is not None, value)
+
+    def _is_after_cursor(self, doc_id: str, data: Dict[str, Any]) -> bool:
+        cursor = self._start_after
+        for field, descending in self._orders:
+            if field != '__name__' and field not in cursor:
+                break
+            value = self._sort_value(doc_id, data, field)
+            target = self._sort_value(cursor.get('__name__'), cursor, field)
+            if value != target:
+                return value < target if descending else value > target
+        return False
+
+    def _ordered(self, docs):
+        for field, descending in reversed(self._orders):
+            docs.sort(key=lambda item: self._sort_value(item[0], item[1], field), reverse=descending)
+        if self._start_after is not None:
+            docs = [item for item in docs if self._is_after_cursor(*item)]
+        return docs
+
+    def run(self, docs):
+        """Apply this query's filters, ordering, cursor and limit to (id, data) pairs"""
+        docs = self._ordered([(doc_id, data) for doc_id, data in docs if self._matches(data)])
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return docs
+
+    def stream(self):
+        self._client.round_trip()
+        for doc_id, data in self._client.scan(self):
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            reference = DocumentReference(self._client, self._collection, doc_id)
+            yield DocumentSnapshot(reference, data)
+
+    def get(self) -> List[DocumentSnapshot]:
+        return list(self.stream())
+
+class CollectionReference(Query):
+    def __init__(self, client: 'MemoryClient', name: str):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, doc_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, self._collection, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: Dict[str, Any]):
+        reference = self.document()
+        reference.set(data)
+        return None, reference
+
+class WriteBatch:
+    def __init__(self, client: 'MemoryClient'):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference: DocumentReference, data: Dict[str, Any], merge: bool = False):
+        self._writes.append(('set', reference, data, merge))
+
+    def update(self, reference: DocumentReference, data: Dict[str, Any]):
+        self._writes.append(('update', reference, data, False))
+
+    def delete(self, reference: DocumentReference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        """Apply all writes atomically: nothing is written if any write would fail"""
+        self._client.round_trip()
+        with self._client.transaction():
+            exists = {}
+            for kind, reference, _, _ in self._writes:
+                path = reference.path
+                if path not in exists:
+                    exists[path] = self._client.read(reference.collection_name, reference.id) is not None
+                if kind == 'update' and not exists[path]:
+                    raise NotFound(f'No document to update: {path}')
+                exists[path] = kind != 'delete'
+
+            for kind, reference, data, merge in self._writes:
+                if kind == 'set':
+                    reference._set(data, merge=merge)
+                elif kind == 'update':
+                    reference._update(data)
+                else:
+                    reference._delete()
+            self._client.commits += 1
+        self._writes = []
+
+class MemoryClient:
+    """In-memory stand-in for the Firestore client, for local runs and benchmarks
+
+    Implements the subset of the Firestore API the routers use. Set
+    MEMORY_STORE_LATENCY_MS to make every call block for a simulated
+    network round trip, as the real client does.
+
+    Other stores reuse the document, query and batch classes by providing
+    the same primitives: transaction(), read(), write() and scan(). Data
+    returned by read() and scan() belongs to the caller.
+    """
+
+    def __init__(self, latency_ms: Optional[float] = None):
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.RLock()
+        self.commits = 0
+        if latency_ms is None:
+            latency_ms = float(os.getenv('MEMORY_STORE_LATENCY_MS', '0'))
+        self.latency = latency_ms / 1000
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def transaction(self):
+        """Context in which reads and writes are applied atomically"""
+        return self.lock
+
+    def read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return copy.deepcopy(self.collections.get(collection, {}).get(doc_id))
+
+    def write(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        """Store a document, or delete it when data is None"""
+        with self.lock:
+            if data is None:
+                self.collections.get(collection, {}).pop(doc_id, None)
+            else:
+                self.collections.setdefault(collection, {})[doc_id] = data
+
+    def scan(self, query: Query):
+        """The (id, data) pairs a query returns"""
+        with self.lock:
+            docs = query.run(self.collections.get(query._collection, {}).items())
+            return [(doc_id, copy.deepcopy(data)) for doc_id, data in docs]
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references: List[DocumentReference]):
+        self.round_trip()
+        for reference in references:
+            yield reference._get()
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+import numpy as np
+
+class MenuMatrix:
+    """A user's menu as a sparse cocktails x ingredients cost matrix
+
+    Stored in COO form (row, column, cost) so applying a price-change
+    vector to every cocktail is one gather and one bincount, whatever the
+    number of cocktails or distinct ingredients.
+    """
+
+    def __init__(self, docs: List[Tuple[str, Dict[str, Any]]]):
+        self.cocktail_ids = [doc_id for doc_id, _ in docs]
+        self.names = [data['name'] for _, data in docs]
+        self.profit_margins = np.array([data['profitMargin'] for _, data in docs], dtype=np.float64)
+        servings = np.array([data['servings'] for _, data in docs], dtype=np.float64)
+        # Same rule as calculate_cocktail_costs: non-positive servings count as one
+        self.servings = np.where(servings > 0, servings, 1.0)
+
+        self.ingredient_index: Dict[str, int] = {}
+        rows, columns, costs = [], [], []
+        for row, (_, data) in enumerate(docs):
+            for ingredient in data['ingredients']:
+                column = self.ingredient_index.setdefault(ingredient['ingredient_id'], len(self.ingredient_index))
+                rows.append(row)
+                columns.append(column)
+                costs.append(ingredient['cost'])
+
+        self.rows = np.array(rows, dtype=np.int64)
+        self.columns = np.array(columns, dtype=np.int64)
+        self.costs = np.array(costs, dtype=np.float64)
+
+    def multipliers(self, changes: Dict[str, float]) -> np.ndarray:
+        """Per-ingredient price multipliers from {ingredient_id: percent change}"""
+        multipliers = np.ones(len(self.ingredient_index), dtype=np.float64)
+        for ingredient_id, percent in changes.items():
+            column = self.ingredient_index.get(ingredient_id)
+            if column is not None:
+                multipliers[column] = 1 + percent / 100
+        return multipliers
+
+    def evaluate(self, multipliers: np.ndarray) -> Dict[str, np.ndarray]:
+        """Total cost, cost per serving and selling price of every cocktail"""
+        count = len(self.cocktail_ids)
+        total_cost = np.bincount(self.rows, weights=self.costs * multipliers[self.columns], minlength=count)
+        return {
+            'total_cost': total_cost,
+            'cost_per_serving': total_cost / self.servings,
+            'selling_price': total_cost * (1 + self.profit_margins / 100)
+        }
+
+MAX_CACHED_MENUS = 256
+
+_menus: OrderedDict = OrderedDict()
+
+def get_menu_matrix(user_id: str, docs: List[Tuple[str, Dict[str, Any]]]) -> MenuMatrix:
+    """Get the user's menu matrix, rebuilt only when the cached listing changes
+
+    The list cache hands out the same list object until the user's
+    cocktails are written or the entry expires, so identity tells us
+    whether the matrix built from it is still current.
+    """
+    cached = _menus.get(user_id)
+    if cached is not None and cached[0] is docs:
+        _menus.move_to_end(user_id)
+        return cached[1]
+
+    matrix = MenuMatrix(docs)
+    _menus[user_id] = (docs, matrix)
+    _menus.move_to_end(user_id)
+    while len(_menus) > MAX_CACHED_MENUS:
+        _menus.popitem(last=False)
+    return matrix
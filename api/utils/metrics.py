@@ -0,0 +1,134 @@
+import bisect
+import contextvars
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+DATASTORE_OPERATIONS = ('read', 'write', 'query')
+
+LabelValues = Tuple[str, ...]
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[LabelValues, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(self.labels, label_values)} {format_number(value)}')
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (non-cumulative, plus +Inf), sum]
+        self.values: Dict[LabelValues, List[Any]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for label_values, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else format_number(bound)
+                    labels = format_labels(self.labels, label_values, f'le="{le}"')
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {format_number(total)}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status'))
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+DATASTORE_OPERATIONS_TOTAL = Counter(
+    'datastore_operations_total', 'Datastore document reads, document writes and queries, including background jobs',
+    ('operation',)
+)
+DATASTORE_OPERATIONS_PER_REQUEST = Histogram(
+    'datastore_operations_per_request', 'Datastore document reads, document writes and queries per request',
+    ('method', 'route', 'operation'), buckets=COUNT_BUCKETS
+)
+SCRAPER_FETCH_DURATION = Histogram('scraper_fetch_duration_seconds', 'Product page fetch time by retailer', ('retailer',))
+SCRAPER_PARSE_DURATION = Histogram('scraper_parse_duration_seconds', 'Product page parse time by retailer', ('retailer',))
+SCRAPER_FAILURES = Counter('scraper_failures_total', 'Failed product page scrapes by retailer and stage', ('retailer', 'stage'))
+
+METRICS = [
+    REQUESTS, REQUEST_DURATION, DATASTORE_OPERATIONS_TOTAL, DATASTORE_OPERATIONS_PER_REQUEST,
+    SCRAPER_FETCH_DURATION, SCRAPER_PARSE_DURATION, SCRAPER_FAILURES
+]
+
+# Datastore operation counts for the request being served, set by the metrics middleware
+_request_operations: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    'request_operations', default=None
+)
+
+def start_request() -> Dict[str, int]:
+    operations = dict.fromkeys(DATASTORE_OPERATIONS, 0)
+    _request_operations.set(operations)
+    return operations
+
+def finish_request(method: str, route: str, status: int, seconds: float, operations: Dict[str, int]):
+    REQUESTS.inc(method, route, str(status))
+    REQUEST_DURATION.observe(seconds, method, route)
+    for operation, count in operations.items():
+        DATASTORE_OPERATIONS_PER_REQUEST.observe(count, method, route, operation)
+
+def record_datastore(operation: str, count: int = 1):
+    """Count datastore work, and charge it to the current request if there is one"""
+    operations = _request_operations.get()
+    if operations is not None:
+        operations[operation] += count
+    DATASTORE_OPERATIONS_TOTAL.inc(operation, amount=count)
+
+def retailer_for(url: str) -> str:
+    url = url.lower()
+    if 'bws.com.au' in url:
+        return 'bws'
+    if 'liquorland.com.au' in url:
+        return 'liquorland'
+    return 'other'
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+CACHE_DIR = os.getenv('SCRAPER_CACHE_DIR', '/tmp/bar-price-tracker/page-cache')
+CACHE_MAX_BYTES = int(os.getenv('SCRAPER_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+def hash_body(body: bytes) -> str:
+    """Hash a response body"""
+    return hashlib.sha256(body).hexdigest()
+
+class PageCache:
+    """On-disk cache of product page validators and parsed data, keyed by URL
+
+    Each entry keeps the ETag/Last-Modified validators, a hash of the last
+    body seen and the data parsed from it, so an unchanged page never has
+    to be parsed again. Entries are evicted least-recently-used once the
+    directory grows past max_bytes. Safe to call from worker threads, so
+    the scraper can keep disk reads and writes off the event loop.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.counters = {'not_modified': 0, 'unchanged': 0, 'misses': 0, 'evictions': 0}
+        self._sizes: Optional[OrderedDict] = None
+        self.lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json')
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _index(self) -> OrderedDict:
+        """Entry sizes in least- to most-recently-used order, loaded from disk once"""
+        if self._sizes is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    stat = os.stat(os.path.join(self.directory, name))
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+            self._sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+        return self._sizes
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the cached entry for a URL"""
+        key = self._key(url)
+        with self.lock:
+            if key not in self._index():
+                return None
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self._sizes.pop(key, None)
+            return None
+
+        with self.lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+        return entry
+
+    def put(self, url: str, entry: Dict[str, Any]):
+        """Store the entry for a URL, evicting old entries past the size bound"""
+        key = self._key(url)
+        # Encoded once, so the size recorded matches the bytes on disk (st_size)
+        encoded = json.dumps(dict(entry, url=url), default=str).encode()
+
+        with self.lock:
+            index = self._index()
+        # Unique per write, so concurrent puts of one URL don't share a temp file
+        tmp_path = f'{self._path(key)}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        os.replace(tmp_path, self._path(key))
+
+        with self.lock:
+            index[key] = len(encoded)
+            index.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        while total > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+            self.counters['evictions'] += 1
+
+    def record(self, outcome: str):
+        """Count a lookup outcome: not_modified, unchanged or misses"""
+        self.counters[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current cache size"""
+        with self.lock:
+            index = self._index()
+            entries, size = len(index), sum(index.values())
+        hits = self.counters['not_modified'] + self.counters['unchanged']
+        lookups = hits + self.counters['misses']
+        return {
+            **self.counters,
+            'hits': hits,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes
+        }
+
+def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a cached entry"""
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+    return headers
+
+page_cache = PageCache()
@@ -0,0 +1,141 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+from utils.list_cache import LIST_CACHE_TTL, get_user_documents
+from utils.write_events import on_write
+
+# Australian standard drink: 10g of alcohol; ethanol weighs 0.789g/ml
+STANDARD_DRINK_GRAMS = 10.0
+ETHANOL_DENSITY = 0.789
+
+SORT_KEYS = ('price_per_liter', 'price_per_standard_drink')
+
+MAX_INDEXED_USERS = 1024
+
+def standard_drinks(size_ml: float, alcohol_percentage: float) -> float:
+    return size_ml * alcohol_percentage / 100 * ETHANOL_DENSITY / STANDARD_DRINK_GRAMS
+
+def index_entry(item_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields an index keeps for an alcohol item, including its sort keys"""
+    drinks = standard_drinks(data.get('size') or 0, data.get('alcoholPercentage') or 0)
+    return {
+        'id': item_id,
+        'name': data['name'],
+        'brand': data['brand'],
+        'type': data['type'],
+        'shop': data['shop'],
+        'price': data['price'],
+        'size': data['size'],
+        'alcohol_percentage': data['alcoholPercentage'],
+        'price_per_liter': data['pricePerLiter'],
+        'price_per_standard_drink': data['price'] / drinks if drinks > 0 else None,
+        'product_url': data.get('productUrl')
+    }
+
+class UserPriceIndex:
+    """One user's alcohol items kept sorted by each sort key, overall and per type"""
+
+    def __init__(self, docs):
+        self.built_at = time.monotonic()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # (sort key, type or None for all) -> sorted [(value, item id)]
+        self.sorted: Dict[Tuple[str, Optional[str]], List[Tuple[float, str]]] = {}
+        for item_id, data in docs:
+            self.upsert(item_id, data)
+
+    def _lists(self, entry: Dict[str, Any]):
+        for key in SORT_KEYS:
+            if entry[key] is None:
+                continue
+            for scope in (None, entry['type'].lower()):
+                yield self.sorted.setdefault((key, scope), []), (entry[key], entry['id'])
+
+    def upsert(self, item_id: str, data: Dict[str, Any]):
+        self.remove(item_id)
+        entry = index_entry(item_id, data)
+        self.entries[item_id] = entry
+        for values, value in self._lists(entry):
+            bisect.insort(values, value)
+
+    def remove(self, item_id: str):
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        for values, value in self._lists(entry):
+            position = bisect.bisect_left(values, value)
+            if position < len(values) and values[position] == value:
+                del values[position]
+
+    def top_k(self, sort_key: str, k: int, type: Optional[str] = None,
+              brand: Optional[str] = None, shop: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The k cheapest items by sort_key matching the filters"""
+        brand = brand.lower() if brand else None
+        shop = shop.lower() if shop else None
+
+        results = []
+        for _, item_id in self.sorted.get((sort_key, type.lower() if type else None), []):
+            entry = self.entries[item_id]
+            if brand and entry['brand'].lower() != brand:
+                continue
+            if shop and entry['shop'].lower() != shop:
+                continue
+            results.append(entry)
+            if len(results) == k:
+                break
+        return results
+
+class PriceIndex:
+    """Per-user sorted price indexes, built on first query and kept current by writes
+
+    Writes from this process update a loaded index in place; an index is
+    rebuilt from the list cache once it is older than the list cache TTL,
+    to pick up writes made by other instances. Like the list cache, each
+    user has a generation counter so an index built while a write landed
+    is not stored, since the write may be missing from it.
+    """
+
+    def __init__(self, ttl: float = LIST_CACHE_TTL, max_users: int = MAX_INDEXED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.users: OrderedDict = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id: str) -> UserPriceIndex:
+        with self.lock:
+            index = self.users.get(user_id)
+            if index is not None and time.monotonic() - index.built_at < self.ttl:
+                self.users.move_to_end(user_id)
+                return index
+            generation = self.generations.get(user_id, 0)
+
+        index = UserPriceIndex(get_user_documents('alcohol_items', user_id))
+        with self.lock:
+            if generation != self.generations.get(user_id, 0):
+                # A write landed during the build; serve this index but build afresh next time
+                return index
+            self.users[user_id] = index
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        return index
+
+    def apply_write(self, user_id: str, item_id: str, data: Optional[Dict[str, Any]]):
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            index = self.users.get(user_id)
+            if index is None:
+                return
+            if data is None:
+                index.remove(item_id)
+            else:
+                index.upsert(item_id, data)
+
+price_index = PriceIndex()
+
+@on_write
+def update_price_index(collection: str, user_id: str, doc_id: str, data):
+    if collection == 'alcohol_items':
+        price_index.apply_write(user_id, doc_id, data)
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Tuple
+import numpy as np
+
+SERIES_COLLECTION = 'price_series'
+
+BUCKETS = ('day', 'week', 'month')
+
+SECONDS_PER_DAY = 86400
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_naive_utc(when: datetime) -> datetime:
+    """Normalize to a naive UTC datetime, as produced by datetime.utcnow()"""
+    if when.tzinfo is not None:
+        return when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+def epoch_seconds(when: datetime) -> int:
+    return int((to_naive_utc(when) - EPOCH).total_seconds())
+
+def month_key(when: datetime) -> str:
+    return to_naive_utc(when).strftime('%Y-%m')
+
+def series_doc_id(item_id: str, when: datetime) -> str:
+    """Id of the monthly chunk holding an item's prices at a point in time"""
+    return f"{item_id}_{month_key(when)}"
+
+def append_price(writer, label: str, db, item_id: str, user_id: str, price: float, when: datetime):
+    """Add a price point to the item's monthly chunk through a BatchWriter
+
+    Points are stored as a map of epoch seconds to price, so appending is a
+    single merge write and a month of history is a single document read.
+    """
+    ref = db.collection(SERIES_COLLECTION).document(series_doc_id(item_id, when))
+    writer.set(label, ref, {
+        'itemId': item_id,
+        'userId': user_id,
+        'month': month_key(when),
+        'points': {str(epoch_seconds(when)): price}
+    }, merge=True)
+
+def month_range(start: datetime, end: datetime) -> List[datetime]:
+    """First day of every month overlapping [start, end]"""
+    months = []
+    current = datetime(start.year, start.month, 1)
+    while current <= end:
+        months.append(current)
+        current = datetime(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+def load_series(db, item_id: str, user_id: str, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """Load an item's price points in [start, end] as sorted (timestamps, prices) arrays"""
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    refs = [
+        db.collection(SERIES_COLLECTION).document(series_doc_id(item_id, month))
+        for month in month_range(start, end)
+    ]
+
+    timestamps, prices = [], []
+    for snapshot in db.get_all(refs):
+        if not snapshot.exists:
+            continue
+        data = snapshot.to_dict()
+        if data.get('userId') != user_id:
+            continue
+        points = data.get('points', {})
+        timestamps.extend(int(ts) for ts in points.keys())
+        prices.extend(points.values())
+
+    ts = np.array(timestamps, dtype=np.int64)
+    values = np.array(prices, dtype=np.float64)
+    order = np.argsort(ts, kind='stable')
+    ts, values = ts[order], values[order]
+
+    in_range = (ts >= epoch_seconds(start)) & (ts <= epoch_seconds(end))
+    return ts[in_range], values[in_range]
+
+def bucket_starts(ts: np.ndarray, bucket: str) -> np.ndarray:
+    """Start of the day/week (Monday)/month each timestamp falls in, as epoch days"""
+    days = ts // SECONDS_PER_DAY
+    if bucket == 'day':
+        return days
+    if bucket == 'week':
+        # 1970-01-01 was a Thursday
+        return days - (days + 3) % 7
+    months = ts.astype('datetime64[s]').astype('datetime64[M]')
+    return months.astype('datetime64[D]').astype(np.int64)
+
+def aggregate(ts: np.ndarray, prices: np.ndarray, bucket: str) -> List[Dict[str, Any]]:
+    """min/max/avg/last price per bucket, computed over sorted points"""
+    if len(ts) == 0:
+        return []
+
+    keys = bucket_starts(ts, bucket)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    counts = ends - starts
+
+    minimum = np.minimum.reduceat(prices, starts)
+    maximum = np.maximum.reduceat(prices, starts)
+    average = np.add.reduceat(prices, starts) / counts
+    last = prices[ends - 1]
+
+    return [
+        {
+            'start': (EPOCH + timedelta(days=int(day))).date().isoformat(),
+            'min': float(minimum[i]),
+            'max': float(maximum[i]),
+            'avg': round(float(average[i]), 4),
+            'last': float(last[i]),
+            'count': int(counts[i])
+        }
+        for i, day in enumerate(keys[starts])
+    ]
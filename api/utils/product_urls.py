@@ -0,0 +1,25 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'srsltid', 'ref', 'cid'}
+
+def normalize_product_url(url: str, base_url: str = '') -> str:
+    """Canonical form of a product URL, so the same product matches however it was linked
+
+    Resolves relative links against base_url, lower-cases the scheme and host,
+    drops any www. prefix, default port, fragment, trailing slash and tracking
+    parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(urljoin(base_url, url.strip()))
+    scheme = (parts.scheme or 'https').lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    path = parts.path.rstrip('/') or '/'
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
@@ -0,0 +1,286 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from utils.session import get_user_id
+
+# Users allowed to profile their requests, comma separated; profiling is off when empty
+PROFILE_ALLOWED_USERS = {user.strip() for user in os.getenv('PROFILE_ALLOWED_USERS', '').split(',') if user.strip()}
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_PER_MINUTE = int(os.getenv('PROFILE_MAX_PER_MINUTE', '10'))
+PROFILE_MAX_CONCURRENT = int(os.getenv('PROFILE_MAX_CONCURRENT', '1'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+
+# Categories reported separately, matched against the modules on a sampled
+# stack from the innermost frame outwards; the first match wins
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ('regex', ('re', 're._compiler', 're._parser', 'sre_compile', 'sre_parse')),
+    ('html_parsing', ('lxml', 'bs4', 'html5lib', 'utils.extraction')),
+    ('datastore', (
+        'google.cloud.firestore', 'google.cloud.firestore_v1', 'google.api_core', 'grpc',
+        'utils.memory_store', 'utils.sqlite_store', 'utils.instrumented_client', 'sqlite3'
+    )),
+    ('pydantic', ('pydantic', 'pydantic_core', 'fastapi._compat')),
+]
+
+Stack = Tuple[str, ...]
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def frame_stack(frame) -> Stack:
+    """Labels of a thread's frames, outermost first"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+def categorize(stack: Stack) -> str:
+    for label in reversed(stack):
+        module = label.split(':', 1)[0]
+        for category, prefixes in CATEGORIES:
+            if any(module == prefix or module.startswith(prefix + '.') for prefix in prefixes):
+                return category
+    return 'other'
+
+class Profile:
+    """Samples the threads working on one request every interval
+
+    On the event loop thread a sample is only taken while the request's own
+    task is running; datastore threads are sampled while they run a call
+    made by the request (see traced).
+    """
+
+    def __init__(self, route: str, user_id: str, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.id = uuid.uuid4().hex
+        self.route = route
+        self.user_id = user_id
+        self.interval = interval
+        self.samples: Dict[Stack, int] = {}
+        self.ticks = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.loop_thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.sampler = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self.stopped.set()
+        self.sampler.join()
+
+    def enter_thread(self):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+
+    def exit_thread(self):
+        with self.lock:
+            self.threads.discard(threading.get_ident())
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        with self.lock:
+            thread_ids = list(self.threads)
+        if asyncio.current_task(self.loop) is self.task:
+            thread_ids.append(self.loop_thread)
+        self.ticks += 1
+        for thread_id in thread_ids:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                stack = frame_stack(frame)
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def categories(self) -> Dict[str, float]:
+        """Sampled milliseconds per category"""
+        totals = {category: 0.0 for category, _ in CATEGORIES}
+        totals['other'] = 0.0
+        for stack, count in self.samples.items():
+            totals[categorize(stack)] += count * self.interval * 1000
+        return totals
+
+    def folded(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in sorted(self.samples.items())) + '\n'
+
+    def tree(self, min_fraction: float = 0.005) -> Dict[str, Any]:
+        """Call tree of sample counts, leaving out nodes under min_fraction of all samples"""
+        root = {'name': self.route, 'samples': 0, 'children': {}}
+        for stack, count in self.samples.items():
+            root['samples'] += count
+            node = root
+            for label in stack:
+                child = node['children'].setdefault(label, {'name': label, 'samples': 0, 'children': {}})
+                child['samples'] += count
+                node = child
+
+        cutoff = root['samples'] * min_fraction
+
+        def prune(node):
+            children = sorted(node['children'].values(), key=lambda child: -child['samples'])
+            node['children'] = [prune(child) for child in children if child['samples'] >= cutoff]
+            return node
+
+        return prune(root)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'route': self.route,
+            'user_id': self.user_id,
+            'duration_ms': round(self.duration * 1000, 2),
+            'interval_ms': self.interval * 1000,
+            'ticks': self.ticks,
+            'samples': sum(self.samples.values()),
+            'categories_ms': {category: round(ms, 2) for category, ms in self.categories().items()},
+            'tree': self.tree()
+        }
+
+    def server_timing(self) -> str:
+        parts = [f'{category};dur={ms:.1f}' for category, ms in self.categories().items() if ms]
+        parts.append(f'total;dur={self.duration * 1000:.1f}')
+        return ', '.join(parts)
+
+_active_profile: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar('active_profile', default=None)
+
+def traced(fn: Callable) -> Callable:
+    """Wrap a call about to run on another thread so the request's profile samples that thread"""
+    profile = _active_profile.get()
+    if profile is None:
+        return fn
+
+    def call(*args, **kwargs):
+        profile.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.exit_thread()
+
+    return call
+
+class ProfileLimiter:
+    """Per-process cap on how many requests are profiled, per minute and at once"""
+
+    def __init__(self, per_minute: int = PROFILE_MAX_PER_MINUTE, concurrent: int = PROFILE_MAX_CONCURRENT):
+        self.per_minute = per_minute
+        self.concurrent = concurrent
+        self.started = deque()
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            while self.started and now - self.started[0] > 60:
+                self.started.popleft()
+            if len(self.started) >= self.per_minute or self.running >= self.concurrent:
+                return False
+            self.started.append(now)
+            self.running += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.running -= 1
+
+class ProfileStore:
+    """The most recent profile reports, by id"""
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.keep = keep
+        self.reports: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def put(self, profile: Profile):
+        with self.lock:
+            self.reports[profile.id] = profile
+            while len(self.reports) > self.keep:
+                self.reports.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self.lock:
+            return self.reports.get(profile_id)
+
+profile_limiter = ProfileLimiter()
+profile_store = ProfileStore()
+
+def profiling_requested(scope) -> bool:
+    headers = dict(scope['headers'])
+    if headers.get(b'x-profile', b'').lower() in (b'1', b'true'):
+        return True
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return query.get('profile', [''])[-1].lower() in ('1', 'true')
+
+def profiling_user(scope) -> Optional[str]:
+    """The caller's user id if they may profile requests; only session tokens are accepted"""
+    authorization = dict(scope['headers']).get(b'authorization')
+    if not PROFILE_ALLOWED_USERS or not authorization:
+        return None
+    try:
+        user_id = get_user_id(user_id=None, authorization=authorization.decode('latin-1'))
+    except HTTPException:
+        return None
+    return user_id if user_id in PROFILE_ALLOWED_USERS else None
+
+class ProfilingMiddleware:
+    """Runs the sampling profiler around requests that ask for it with an
+    X-Profile: 1 header or profile=1 query parameter
+
+    Only users in PROFILE_ALLOWED_USERS, identified by session token, are
+    profiled, and at most PROFILE_MAX_PER_MINUTE requests per process. The
+    response carries an X-Profile-Id header naming the stored report and a
+    Server-Timing header with the time spent per category.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not profiling_requested(scope):
+            return await self.app(scope, receive, send)
+        user_id = profiling_user(scope)
+        if user_id is None or not profile_limiter.acquire():
+            return await self.app(scope, receive, send)
+
+        profile = Profile(f"{scope['method']} {scope['path']}", user_id)
+        token = _active_profile.set(profile)
+        profile.start()
+
+        async def send_with_report(message):
+            if message['type'] == 'http.response.start' and not profile.stopped.is_set():
+                profile.stop()
+                profile_store.put(profile)
+                message = dict(message, headers=list(message.get('headers', [])) + [
+                    (b'x-profile-id', profile.id.encode()),
+                    (b'server-timing', profile.server_timing().encode())
+                ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            if not profile.stopped.is_set():
+                profile.stop()
+                profile_store.put(profile)
+            _active_profile.reset(token)
+            profile_limiter.release()
@@ -0,0 +1,86 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+from fastapi import HTTPException
+from utils.firebase_utils import get_firestore_client
+from utils.list_cache import Documents, list_cache, load_user_documents
+from utils.write_events import notify_write
+from utils.profiling import traced
+
+# Threads for blocking datastore calls; each in-flight call holds one
+DATASTORE_THREADS = int(os.getenv('DATASTORE_THREADS', '32'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DATASTORE_THREADS, thread_name_prefix='datastore')
+        return _executor
+
+async def run_blocking(fn: Callable, *args, **kwargs):
+    """Run a blocking datastore call on the datastore thread pool
+
+    Keeps the event loop free to serve other requests while the call waits
+    on the network. The call runs in a copy of the caller's context, so its
+    datastore operations are counted against, and profiled with, the
+    request that made it.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, traced(functools.partial(fn, *args, **kwargs)))
+
+class Repository:
+    """Async access to a collection of per-user documents
+
+    Every datastore call runs on the datastore thread pool, and every write
+    is announced with notify_write once it has been committed.
+    """
+
+    def __init__(self, collection: str, label: str = 'Item'):
+        self.collection = collection
+        self.label = label
+
+    def ref(self, doc_id: str):
+        return get_firestore_client().collection(self.collection).document(doc_id)
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = await run_blocking(self.ref(doc_id).get)
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def get_owned(self, doc_id: str, user_id: str) -> Dict[str, Any]:
+        """Get a document, raising 404 if it is missing and 403 if another user owns it"""
+        data = await self.get(doc_id)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"{self.label} not found")
+        if data['userId'] != user_id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        return data
+
+    async def list_for_user(self, user_id: str) -> Documents:
+        """A user's documents, from the list cache when it holds them"""
+        docs = list_cache.get(self.collection, user_id)
+        if docs is None:
+            docs = await run_blocking(load_user_documents, self.collection, user_id)
+        return docs
+
+    async def create(self, doc_id: str, user_id: str, data: Dict[str, Any]):
+        await run_blocking(self.ref(doc_id).set, data)
+        notify_write(self.collection, user_id, doc_id, data)
+
+    async def update(self, doc_id: str, user_id: str, existing: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply changes to a document already read as existing, returning the merged document"""
+        await run_blocking(self.ref(doc_id).update, changes)
+        merged = {**existing, **changes}
+        notify_write(self.collection, user_id, doc_id, merged)
+        return merged
+
+    async def delete(self, doc_id: str, user_id: str):
+        await run_blocking(self.ref(doc_id).delete)
+        notify_write(self.collection, user_id, doc_id, None)
@@ -0,0 +1,246 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Set
+from utils.list_cache import LIST_CACHE_TTL, get_user_documents
+from utils.write_events import on_write
+
+# Collection -> (result kind, [(stored field, weight)])
+SEARCH_FIELDS = {
+    'alcohol_items': ('alcohol', [('name', 3.0), ('brand', 2.0), ('type', 1.0)]),
+    'ingredients': ('ingredient', [('name', 3.0), ('type', 1.0), ('category', 1.0)]),
+    'cocktails': ('cocktail', [('name', 3.0), ('category', 1.0), ('tags', 1.0)]),
+}
+
+MAX_INDEXED_USERS = 1024
+# Vocabulary terms a single prefix or fuzzy query token may expand to
+MAX_EXPANSIONS = 100
+# Minimum trigram (Dice) similarity for a typo to count as a match
+FUZZY_THRESHOLD = 0.45
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+# Document key: (collection, document id)
+DocKey = Tuple[str, str]
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, accent-stripped alphanumeric words"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+    return TOKEN.findall(text)
+
+def trigrams(term: str) -> Set[str]:
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance between two words, or limit + 1 once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def field_text(value: Any) -> str:
+    if isinstance(value, list):
+        return ' '.join(str(part) for part in value)
+    return str(value) if value is not None else ''
+
+def search_entry(collection: str, doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """What a search result shows for a document"""
+    return {
+        'id': doc_id,
+        'kind': SEARCH_FIELDS[collection][0],
+        'name': data.get('name') or '',
+        'brand': data.get('brand'),
+        'type': data.get('type'),
+        'category': data.get('category'),
+        'tags': data.get('tags')
+    }
+
+class UserSearchIndex:
+    """One user's inverted index of words, with a trigram index over the vocabulary
+
+    Words map to the documents containing them, with the weight of the best
+    field they appear in. The sorted vocabulary answers prefix queries and
+    the trigram index finds words within a typo or two of a query word.
+    """
+
+    def __init__(self, docs_by_collection: Dict[str, List[Tuple[str, Dict[str, Any]]]]):
+        self.built_at = time.monotonic()
+        self.entries: Dict[DocKey, Dict[str, Any]] = {}
+        self.doc_terms: Dict[DocKey, Dict[str, float]] = {}
+        self.postings: Dict[str, Dict[DocKey, float]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        self.vocabulary: List[str] = []
+        for collection, docs in docs_by_collection.items():
+            for doc_id, data in docs:
+                self.upsert(collection, doc_id, data, sort=False)
+        self.vocabulary.sort()
+
+    def _add_term(self, term: str, sort: bool):
+        if sort:
+            bisect.insort(self.vocabulary, term)
+        else:
+            self.vocabulary.append(term)
+        for gram in trigrams(term):
+            self.grams.setdefault(gram, set()).add(term)
+
+    def _drop_term(self, term: str):
+        del self.postings[term]
+        position = bisect.bisect_left(self.vocabulary, term)
+        if position < len(self.vocabulary) and self.vocabulary[position] == term:
+            del self.vocabulary[position]
+        for gram in trigrams(term):
+            terms = self.grams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.grams[gram]
+
+    def upsert(self, collection: str, doc_id: str, data: Dict[str, Any], sort: bool = True):
+        key = (collection, doc_id)
+        self.remove(collection, doc_id)
+        terms: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELDS[collection][1]:
+            for term in tokenize(field_text(data.get(field))):
+                terms[term] = max(terms.get(term, 0.0), weight)
+
+        self.entries[key] = search_entry(collection, doc_id, data)
+        self.doc_terms[key] = terms
+        for term, weight in terms.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self._add_term(term, sort)
+            self.postings[term][key] = weight
+
+    def remove(self, collection: str, doc_id: str):
+        key = (collection, doc_id)
+        self.entries.pop(key, None)
+        for term in self.doc_terms.pop(key, {}):
+            postings = self.postings[term]
+            postings.pop(key, None)
+            if not postings:
+                self._drop_term(term)
+
+    def expand(self, token: str) -> Dict[str, float]:
+        """Vocabulary terms matching a query word, scored 1 for exact down to ~0.3 for typos"""
+        matches = {token: 1.0} if token in self.postings else {}
+
+        start = bisect.bisect_left(self.vocabulary, token)
+        for term in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                # Longer completions of a short prefix rank lower
+                matches[term] = 0.5 + 0.4 * len(token) / len(term)
+
+        if len(token) >= 3:
+            query_grams = trigrams(token)
+            shared: Dict[str, int] = {}
+            for gram in query_grams:
+                for term in self.grams.get(gram, ()):
+                    shared[term] = shared.get(term, 0) + 1
+            candidates = sorted(shared.items(), key=lambda pair: -pair[1])[:MAX_EXPANSIONS]
+            # Short words share few trigrams, so a single edit is accepted on its own
+            limit = 1 if len(token) <= 4 else 2
+            for term, count in candidates:
+                similarity = 2 * count / (len(query_grams) + len(trigrams(term)))
+                distance = edit_distance(token, term, limit)
+                if distance <= limit:
+                    similarity = max(similarity, 1 - distance / max(len(token), len(term)))
+                if similarity >= FUZZY_THRESHOLD:
+                    matches[term] = max(matches.get(term, 0.0), 0.7 * similarity)
+        return matches
+
+    def search(self, query: str, limit: int, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Documents matching the query, most query words matched first, then by score"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        scores: Dict[DocKey, float] = {}
+        matched: Dict[DocKey, int] = {}
+        for token in tokens:
+            best: Dict[DocKey, float] = {}
+            for term, term_score in self.expand(token).items():
+                for key, weight in self.postings[term].items():
+                    score = term_score * weight
+                    if score > best.get(key, 0.0):
+                        best[key] = score
+            for key, score in best.items():
+                scores[key] = scores.get(key, 0.0) + score
+                matched[key] = matched.get(key, 0) + 1
+
+        ranked = heapq.nsmallest(
+            limit,
+            (key for key in scores if kind is None or self.entries[key]['kind'] == kind),
+            key=lambda key: (-matched[key], -scores[key], self.entries[key]['name'].lower())
+        )
+        return [{**self.entries[key], 'score': round(scores[key] / len(tokens), 4)} for key in ranked]
+
+class SearchIndex:
+    """Per-user search indexes, built on first query and kept current by writes
+
+    Like the price index, writes from this process update a loaded index in
+    place, an index older than the list cache TTL is rebuilt from the list
+    cache to pick up writes made by other instances, and an index built
+    while a write landed is not stored.
+    """
+
+    def __init__(self, ttl: float = LIST_CACHE_TTL, max_users: int = MAX_INDEXED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.users: OrderedDict = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id: str) -> UserSearchIndex:
+        with self.lock:
+            index = self.users.get(user_id)
+            if index is not None and time.monotonic() - index.built_at < self.ttl:
+                self.users.move_to_end(user_id)
+                return index
+            generation = self.generations.get(user_id, 0)
+
+        index = UserSearchIndex({
+            collection: get_user_documents(collection, user_id) for collection in SEARCH_FIELDS
+        })
+        with self.lock:
+            if generation != self.generations.get(user_id, 0):
+                # A write landed during the build; serve this index but build afresh next time
+                return index
+            self.users[user_id] = index
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        return index
+
+    def search(self, user_id: str, query: str, limit: int, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        index = self.get(user_id)
+        with self.lock:
+            return index.search(query, limit, kind)
+
+    def apply_write(self, collection: str, user_id: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        with self.lock:
+            self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            index = self.users.get(user_id)
+            if index is None:
+                return
+            if data is None:
+                index.remove(collection, doc_id)
+            else:
+                index.upsert(collection, doc_id, data)
+
+search_index = SearchIndex()
+
+@on_write
+def update_search_index(collection: str, user_id: str, doc_id: str, data):
+    if collection in SEARCH_FIELDS:
+        search_index.apply_write(collection, user_id, doc_id, data)
@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from fastapi import Header, HTTPException, Query
+
+SESSION_TTL = int(os.getenv('SESSION_TTL', str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '4096'))
+# When set, routes only accept a bearer token, not a bare user_id query parameter
+REQUIRE_SESSION_TOKEN = os.getenv('REQUIRE_SESSION_TOKEN', '').lower() in ('1', 'true', 'yes')
+
+PBKDF2_ITERATIONS = 200_000
+
+logger = logging.getLogger(__name__)
+
+def _load_secret() -> bytes:
+    secret = os.getenv('SESSION_SECRET')
+    if secret:
+        return secret.encode()
+    if REQUIRE_SESSION_TOKEN:
+        raise RuntimeError("SESSION_SECRET must be set when REQUIRE_SESSION_TOKEN is enabled")
+    logger.warning(
+        "SESSION_SECRET is not set; signing session tokens with a random per-process key. "
+        "Tokens will not verify on other instances or after a restart."
+    )
+    return secrets.token_bytes(32)
+
+SESSION_SECRET = _load_secret()
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SECRET, payload.encode(), hashlib.sha256).digest())
+
+def hash_password(password: str) -> str:
+    """Hash password using salted PBKDF2-SHA256"""
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt}${digest.hex()}"
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against a PBKDF2 hash or a legacy unsalted SHA-256 hash"""
+    if password_hash.startswith('pbkdf2_sha256$'):
+        parts = password_hash.split('$')
+        if len(parts) != 4 or not parts[1].isdigit():
+            return False
+        _, iterations, salt, expected = parts
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), int(iterations))
+        return hmac.compare_digest(digest.hex(), expected)
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash)
+
+def needs_rehash(password_hash: str) -> bool:
+    return not password_hash.startswith(f"pbkdf2_sha256${PBKDF2_ITERATIONS}$")
+
+def issue_token(user_id: str, ttl: int = SESSION_TTL) -> Tuple[str, int]:
+    """Create a signed session token for a user, returning it with its expiry (epoch seconds)"""
+    expires_at = int(time.time()) + ttl
+    payload = _b64encode(json.dumps({'sub': user_id, 'exp': expires_at}, separators=(',', ':')).encode())
+    return f"{payload}.{_sign(payload)}", expires_at
+
+class TokenCache:
+    """Recently verified tokens, so repeat requests skip the HMAC and JSON decode"""
+
+    def __init__(self, max_size: int = SESSION_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Tuple[str, int]]:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is not None:
+                self.entries.move_to_end(token)
+            return entry
+
+    def put(self, token: str, user_id: str, expires_at: int):
+        with self.lock:
+            self.entries[token] = (user_id, expires_at)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+token_cache = TokenCache()
+
+def verify_token(token: str) -> str:
+    """Return the user id a session token was issued to, or raise 401"""
+    cached = token_cache.get(token)
+    if cached is None:
+        payload, _, signature = token.partition('.')
+        if not signature or not hmac.compare_digest(signature, _sign(payload)):
+            raise HTTPException(status_code=401, detail="Invalid session token")
+        try:
+            claims: Dict[str, Any] = json.loads(_b64decode(payload))
+            cached = (str(claims['sub']), int(claims['exp']))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=401, detail="Invalid session token")
+        token_cache.put(token, *cached)
+
+    user_id, expires_at = cached
+    if expires_at <= time.time():
+        raise HTTPException(status_code=401, detail="Session token expired")
+    return user_id
+
+def get_user_id(
+    user_id: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+) -> str:
+    """Resolve the calling user from a bearer session token
+
+    Falls back to the user_id query parameter for clients that have not
+    switched to tokens yet, unless REQUIRE_SESSION_TOKEN is set. A token and
+    a user_id that disagree are rejected.
+    """
+    if authorization:
+        scheme, _, token = authorization.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            raise HTTPException(status_code=401, detail="Invalid authorization header")
+        token_user_id = verify_token(token.strip())
+        if user_id is not None and user_id != token_user_id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        return token_user_id
+
+    if REQUIRE_SESSION_TOKEN or user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user_id
@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from utils.memory_store import CollectionReference, DocumentReference, DocumentSnapshot, Query, WriteBatch
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', '/tmp/bar-price-tracker/data.sqlite3')
+
+# Fields every collection table is indexed on
+INDEXED_FIELDS = ('userId', 'productUrl', 'type', 'catalogId', 'email')
+
+TABLE_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    raise TypeError(f'Cannot store {type(value).__name__}')
+
+def decode_object(obj: Dict[str, Any]):
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+def dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, default=encode_value, separators=(',', ':'))
+
+def loads(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=decode_object)
+
+def field_sql(field: str) -> str:
+    return f"json_extract(data, '$.{field}')"
+
+class SqliteClient:
+    """Firestore-compatible client over a local SQLite database (STORAGE_BACKEND=sqlite)
+
+    Each collection is a table of (id, JSON data) with expression indexes
+    on userId, productUrl, type and catalogId, so the routers' per-user
+    queries and catalog fan-out are index lookups. Equality, 'in' and
+    '!= None' filters on plain fields are answered in SQL; anything else
+    falls back to filtering in Python with the same rules as the in-memory
+    store. Every thread keeps its own
+    connection to the WAL-mode database, so the datastore thread pool reads
+    concurrently.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self.local = threading.local()
+        self.tables = set()
+        self.schema_lock = threading.Lock()
+        self.commits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            self.local.depth = 0
+        return conn
+
+    def _table(self, collection: str) -> str:
+        if collection not in self.tables:
+            if not TABLE_NAME.match(collection):
+                raise ValueError(f'Invalid collection name: {collection}')
+            with self.schema_lock:
+                conn = self._connect()
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{collection}" (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+                for field in INDEXED_FIELDS:
+                    conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{collection}_{field}" ON "{collection}" ({field_sql(field)})'
+                    )
+                self.tables.add(collection)
+        return f'"{collection}"'
+
+    def round_trip(self):
+        pass
+
+    @contextmanager
+    def transaction(self):
+        """Context in which reads and writes are applied atomically, on this thread's connection"""
+        conn = self._connect()
+        if self.local.depth == 0:
+            conn.execute('BEGIN IMMEDIATE')
+        self.local.depth += 1
+        try:
+            yield
+        except BaseException:
+            self.local.depth -= 1
+            if self.local.depth == 0:
+                conn.execute('ROLLBACK')
+                # A rolled back transaction may have created a table
+                self.tables.clear()
+            raise
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            conn.execute('COMMIT')
+
+    def read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f'SELECT data FROM {self._table(collection)} WHERE id = ?', (doc_id,)
+        ).fetchone()
+        return loads(row[0]) if row else None
+
+    def write(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]):
+        table = self._table(collection)
+        if data is None:
+            self._connect().execute(f'DELETE FROM {table} WHERE id = ?', (doc_id,))
+        else:
+            self._connect().execute(f'INSERT OR REPLACE INTO {table} (id, data) VALUES (?, ?)', (doc_id, dumps(data)))
+
+    def _pushdown(self, query: Query):
+        """SQL conditions and parameters for the filters SQL can answer exactly"""
+        conditions, params, remaining = [], [], []
+        for field, op, value in query._filters:
+            if not FIELD_NAME.match(field):
+                remaining.append((field, op, value))
+            elif op == '==' and isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                conditions.append(f'{field_sql(field)} = ?')
+                params.append(value)
+            elif op == '!=' and value is None:
+                conditions.append(f'{field_sql(field)} IS NOT NULL')
+            elif op == 'in' and value and all(isinstance(item, str) for item in value):
+                conditions.append(f'{field_sql(field)} IN ({", ".join("?" * len(value))})')
+                params.extend(value)
+            else:
+                remaining.append((field, op, value))
+        return conditions, params, remaining
+
+    def scan(self, query: Query):
+        """The (id, data) pairs a query returns"""
+        conditions, params, remaining = self._pushdown(query)
+
+        # Id-ordered pages can be cut in SQL when every filter was pushed down
+        by_id = not remaining and all(field == '__name__' and not descending for field, descending in query._orders)
+        cursor = query._start_after
+        if by_id and query._orders and cursor is not None and set(cursor) <= {'__name__'}:
+            conditions.append('id > ?')
+            params.append(cursor['__name__'])
+            query = query._copy(start_after=None)
+        sql = f'SELECT id, data FROM {self._table(query._collection)}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if by_id and query._start_after is None:
+            sql += ' ORDER BY id'
+            if query._limit is not None:
+                sql += f' LIMIT {int(query._limit)}'
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return query._copy(filters=remaining).run((doc_id, loads(data)) for doc_id, data in rows)
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references: List[DocumentReference]):
+        """Read many documents with one query per collection, in the order given"""
+        found = {}
+        by_collection: Dict[str, List[str]] = {}
+        for reference in references:
+            by_collection.setdefault(reference.collection_name, []).append(reference.id)
+        conn = self._connect()
+        for collection, doc_ids in by_collection.items():
+            table = self._table(collection)
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(doc_ids), 500):
+                chunk = doc_ids[start:start + 500]
+                rows = conn.execute(
+                    f'SELECT id, data FROM {table} WHERE id IN ({", ".join("?" * len(chunk))})', chunk
+                ).fetchall()
+                for doc_id, data in rows:
+                    found[(collection, doc_id)] = data
+
+        for reference in references:
+            data = found.get((reference.collection_name, reference.id))
+            yield DocumentSnapshot(reference, loads(data) if data is not None else None)
@@ -0,0 +1,20 @@
+from typing import Optional, Dict, Any, Callable, List
+
+# listener(collection, user_id, doc_id, data); data is None for deletes
+WriteListener = Callable[[str, str, str, Optional[Dict[str, Any]]], None]
+
+_listeners: List[WriteListener] = []
+
+def on_write(listener: WriteListener) -> WriteListener:
+    """Register a function to be told about every committed document write"""
+    _listeners.append(listener)
+    return listener
+
+def notify_write(collection: str, user_id: str, doc_id: str, data: Optional[Dict[str, Any]]):
+    """Tell caches and indexes that a user's document was written or deleted
+
+    Call after the write is committed, with the document's full data as
+    now stored (or None if it was deleted).
+    """
+    for listener in _listeners:
+        listener(collection, user_id, doc_id, data)
@@ -0,0 +1,97 @@
+"""Benchmark API cold starts: import time and first-request latency.
+
+Usage (from the repository root):
+    python benchmarks/bench_cold_start.py --runs 5 --output cold-start.json
+
+Every run is a fresh interpreter, as on a serverless cold start, using the
+in-memory storage backend. Reports the median time to import main, start
+the app (lifespan warm-up), serve the first and second requests, and the
+slowest top-level imports from `python -X importtime`. --output writes the
+results as JSON so they can be compared over time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1] / 'api'
+
+# Runs inside the child interpreter; prints one JSON line of timings in ms
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+client.__enter__()
+ready = time.perf_counter()
+timings = {"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}
+for label, path in (("first_request_ms", "/alcohol/?user_id=bench"),
+                    ("second_request_ms", "/alcohol/?user_id=bench"),
+                    ("first_scraper_request_ms", "/scraper/cache-stats")):
+    before = time.perf_counter()
+    assert client.get(path).status_code == 200, path
+    timings[label] = (time.perf_counter() - before) * 1000
+client.__exit__(None, None, None)
+print(json.dumps(timings))
+'''
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault('STORAGE_BACKEND', 'memory')
+    env.setdefault('JOB_WORKERS', '0')
+    return env
+
+def run_once():
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=API_DIR, env=child_env(),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(top: int):
+    """Cumulative import time of the modules imported directly by main"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=API_DIR, env=child_env(), capture_output=True, text=True, check=True)
+    # Children are listed before their parent, one indentation level deeper
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == 'main':
+                break
+            children = []
+        elif depth == 1:
+            children.append((name.strip(), int(cumulative) / 1000))
+    return sorted(children, key=lambda module: module[1], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    medians = {key: round(statistics.median(run[key] for run in runs), 2) for key in runs[0]}
+    imports = slowest_imports(args.top)
+
+    print(f'median of {args.runs} cold starts')
+    for key, value in medians.items():
+        print(f'  {key:26s} {value:9.2f}')
+    print('slowest imports from main (cumulative ms)')
+    for name, ms in imports:
+        print(f'  {name:26s} {ms:9.2f}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'runs': args.runs, 'median_ms': medians,
+                       'imports_ms': dict(imports)}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark product page parsing over the recorded fixture pages.
+
+Usage (from the repository root):
+    python benchmarks/bench_extraction.py --repeat 200
+
+"before" is the original BeautifulSoup/html.parser + whole-page regex
+parser (needs beautifulsoup4 installed); "after" is utils.extraction.
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from fixture_server import FIXTURES_DIR  # noqa: E402
+from utils.extraction import (  # noqa: E402
+    clean_text, extract_alcohol_percentage, extract_price, extract_product, extract_volume
+)
+
+def legacy_parse(html: bytes):
+    """The scraper's parser before the structured-data fast path"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    name_elem = soup.find('h1') or soup.find('h2')
+    name = clean_text(name_elem.get_text()) if name_elem else ""
+    price_elem = soup.find('span', class_=re.compile(r'price|amount')) or soup.find(string=re.compile(r'\$\d+'))
+    price_text = clean_text(str(price_elem)) if price_elem else ""
+    volume_text = name + " " + soup.get_text()
+    img_elem = soup.find('img', src=re.compile(r'product|item'))
+    return {
+        'name': name,
+        'brand': name.split()[0] if name else "",
+        'price': extract_price(price_text),
+        'size': extract_volume(volume_text),
+        'alcohol_percentage': extract_alcohol_percentage(volume_text),
+        'image_url': img_elem.get('src') if img_elem else None
+    }
+
+def per_page_ms(parse, html: bytes, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        parsers = [('before', legacy_parse), ('after', extract_product)]
+    except ImportError:
+        print('beautifulsoup4 not installed; skipping the "before" parser')
+        parsers = [('after', extract_product)]
+
+    for fixture in sorted(FIXTURES_DIR.glob('*_product.html')):
+        html = fixture.read_bytes()
+        print(f'{fixture.name} ({len(html) / 1024:.0f} KiB)')
+        for label, parse in parsers:
+            ms = per_page_ms(parse, html, args.repeat)
+            result = parse(html)
+            print(f'  {label:<7} {ms:7.3f} ms/page  price={result["price"]} '
+                  f'size={result["size"]} abv={result["alcohol_percentage"]}')
+
+if __name__ == '__main__':
+    main()
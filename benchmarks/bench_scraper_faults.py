@@ -0,0 +1,101 @@
+"""Exercise the scraper's throttling, retries and circuit breaker against injected faults.
+
+Usage (from the repository root):
+    python benchmarks/bench_scraper_faults.py --items 200 --latency 0.02
+
+Runs the same batch of fetches against the local fixture server under a
+series of fault scenarios (healthy, throttled, flaky, slow, down, and down
+then recovering) and reports, per scenario, how many fetches succeeded,
+how long the batch took and what the host scheduler did: retries, its
+adaptive concurrency limit at the end, and circuit breaker trips and
+fail-fast rejections.
+"""
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import time
+from pathlib import Path
+
+# Short backoff and breaker timings so the scenarios finish quickly
+os.environ.setdefault('SCRAPER_RETRY_BASE', '0.05')
+os.environ.setdefault('SCRAPER_RETRY_MAX', '0.5')
+os.environ.setdefault('SCRAPER_BREAKER_RESET', '1')
+os.environ.setdefault('SCRAPER_TIMEOUT', '5')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from fixture_server import FixtureServer  # noqa: E402
+from utils.http_client import CircuitOpenError, close_clients, fetch, host_stats  # noqa: E402
+
+SCENARIOS = {
+    'healthy': {},
+    'throttled': {'throttle': 0.2},
+    'flaky': {'error': 0.2, 'drop': 0.05},
+    'slow': {'slow': 0.05, 'slow_seconds': 1.0},
+    'down': {'down': True},
+}
+
+async def fetch_one(url: str):
+    try:
+        response = await fetch(url)
+    except CircuitOpenError:
+        return 'rejected'
+    except Exception:
+        return 'error'
+    return 'ok' if response.status_code == 200 else f'http {response.status_code}'
+
+async def run_batch(urls):
+    outcomes = await asyncio.gather(*(fetch_one(url) for url in urls))
+    stats = next(iter(host_stats().values()))
+    await close_clients()
+    return outcomes, stats
+
+async def run_recovery(server: FixtureServer, urls, outage: float):
+    """Take the host down, then bring it back while fetches keep arriving"""
+    server.faults.set(down=True)
+    asyncio.get_running_loop().call_later(outage, functools.partial(server.faults.set, down=False))
+    outcomes = []
+    deadline = time.monotonic() + outage * 3
+    for start in range(0, len(urls), 10):
+        outcomes.extend(await asyncio.gather(*(fetch_one(url) for url in urls[start:start + 10])))
+        if time.monotonic() > deadline:
+            break
+        await asyncio.sleep(outage / 10)
+    stats = next(iter(host_stats().values()))
+    await close_clients()
+    return outcomes, stats
+
+def report(name: str, outcomes, stats, elapsed: float):
+    ok = outcomes.count('ok')
+    rejected = outcomes.count('rejected')
+    print(f'{name:<10} {len(outcomes):>6} {ok:>6} {rejected:>9} {len(outcomes) - ok - rejected:>7} '
+          f'{elapsed:8.2f}s {stats["retries"]:>8} {stats["limit"]:>6} {stats["circuit"]:>10} {stats["circuit_trips"]:>6}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='simulated retailer response time in seconds')
+    parser.add_argument('--only', help='comma-separated scenarios to run (plus "recovery")')
+    args = parser.parse_args()
+
+    names = list(SCENARIOS) + ['recovery']
+    if args.only:
+        names = [name for name in names if name in args.only.split(',')]
+
+    print(f'{"scenario":<10} {"total":>6} {"ok":>6} {"rejected":>9} {"failed":>7} {"elapsed":>9} '
+          f'{"retries":>8} {"limit":>6} {"circuit":>10} {"trips":>6}')
+    for name in names:
+        with FixtureServer(latency=args.latency, **SCENARIOS.get(name, {})) as server:
+            urls = [f'{server.base_url}/bws.com.au/product/{index}' for index in range(args.items)]
+            started = time.perf_counter()
+            if name == 'recovery':
+                outcomes, stats = asyncio.run(run_recovery(server, urls, outage=1.5))
+            else:
+                outcomes, stats = asyncio.run(run_batch(urls))
+            report(name, outcomes, stats, time.perf_counter() - started)
+
+if __name__ == '__main__':
+    main()
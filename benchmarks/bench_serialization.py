@@ -0,0 +1,101 @@
+"""Benchmark list response serialization with and without FAST_RESPONSES.
+
+Usage (from the repository root):
+    python benchmarks/bench_serialization.py --sizes 1000,10000
+
+For a user holding each of --sizes alcohol items, ingredients and cocktails,
+times GET on each list route (warm list cache, in-memory store) through
+response models and through the fast path, and the encoding step alone:
+building response models and dumping them with the route's TypeAdapter,
+against mapping stored documents straight to dicts and encoding them with
+utils.fast_json. Reports microseconds per item and checks both paths
+return the same JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from bench_suite import seed_user  # noqa: E402
+from main import app  # noqa: E402
+from utils import fast_json, firebase_utils  # noqa: E402
+from utils.list_cache import get_user_documents  # noqa: E402
+from utils.memory_store import MemoryClient  # noqa: E402
+import alcohol_items  # noqa: E402
+import cocktails  # noqa: E402
+import ingredients  # noqa: E402
+
+ROUTES = [
+    ('alcohol', '/alcohol/', 'alcohol_items', alcohol_items.AlcoholItemResponse,
+     alcohol_items.to_alcohol_item_response, alcohol_items.fast_alcohol_item),
+    ('ingredients', '/ingredients/', 'ingredients', ingredients.IngredientResponse,
+     ingredients.to_ingredient_response, ingredients.fast_ingredient),
+    ('cocktails', '/cocktails/', 'cocktails', cocktails.CocktailResponse,
+     cocktails.to_cocktail_response, cocktails.fast_cocktail),
+]
+
+def best_of(fn, repeat: int) -> float:
+    """Fastest of repeat runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    encoder = 'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'
+    print(f'fast path encoder: {encoder}')
+    print(f'{"route":<12} {"items":>6} {"step":<7} {"models us/item":>15} {"fast us/item":>13} {"speedup":>8}')
+
+    with TestClient(app) as client:
+        for size in [int(value) for value in args.sizes.split(',')]:
+            firebase_utils.get_memory_client.client = MemoryClient()
+            user_id = f'bench-{size}'
+            seed_user(firebase_utils.get_firestore_client(), user_id, size, 'http://localhost', 0)
+
+            for label, path, collection, model, to_response, fast in ROUTES:
+                docs = get_user_documents(collection, user_id)
+                adapter = TypeAdapter(List[model])
+
+                def encode_models():
+                    return adapter.dump_json([to_response(doc_id, data) for doc_id, data in docs])
+
+                def encode_fast():
+                    return fast_json.dumps([fast(doc_id, data) for doc_id, data in docs])
+
+                def route(enabled: bool):
+                    fast_json.FAST_RESPONSES = enabled
+                    response = client.get(path, params={'user_id': user_id})
+                    response.raise_for_status()
+                    return response.content
+
+                if json.loads(route(False)) != json.loads(route(True)):
+                    raise RuntimeError(f'{label}: fast path JSON differs from the response models')
+
+                for step, slow_fn, fast_fn in (
+                    ('encode', encode_models, encode_fast),
+                    ('route', lambda: route(False), lambda: route(True)),
+                ):
+                    slow = best_of(slow_fn, args.repeat) / size * 1e6
+                    quick = best_of(fast_fn, args.repeat) / size * 1e6
+                    print(f'{label:<12} {size:>6} {step:<7} {slow:>15.2f} {quick:>13.2f} {slow / quick:>7.1f}x')
+            fast_json.FAST_RESPONSES = False
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""Benchmark every API route and the scraper, and compare against a baseline.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --baseline results.json --fail-on-regression
+    python benchmarks/bench_suite.py --sizes 10,1000 --only alcohol,scraper
+
+Runs each route in auth.py, alcohol_items.py, ingredients.py and
+cocktails.py in-process against the in-memory store, for a user holding
+each of --sizes alcohol items, ingredients and cocktails. The scraper
+routes run against the recorded retailer pages served by the local
+fixture server. Every scenario reports p50/p95/p99 latency, throughput and
+peak Python memory (from a separate tracemalloc pass, so tracing does not
+skew the timings). --baseline prints the change against an earlier
+--output file and flags scenarios whose p50 or p95 grew by more than
+--tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('JOB_WORKERS', '0')
+os.environ.setdefault('SCRAPER_CACHE_DIR', tempfile.mkdtemp())
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from main import app  # noqa: E402
+from utils import firebase_utils  # noqa: E402
+from utils.list_cache import list_cache  # noqa: E402
+from utils.memory_store import MemoryClient  # noqa: E402
+from utils.price_series import append_price  # noqa: E402
+from utils.firestore_batch import BatchWriter  # noqa: E402
+
+TYPES = ['gin', 'vodka', 'rum', 'whisky', 'tequila']
+SHOPS = ['bws', 'liquorland', 'dan murphys']
+MEMORY_PASS_ITERATIONS = 5
+
+def alcohol_body(rng: random.Random, index: int, product_url=None):
+    return {
+        'name': f'Item {index}', 'brand': rng.choice(['Brand A', 'Brand B', 'Brand C']),
+        'type': rng.choice(TYPES), 'size': rng.choice([700, 1000]), 'alcohol_percentage': 40.0,
+        'price': round(rng.uniform(30, 90), 2), 'shop': rng.choice(SHOPS), 'product_url': product_url
+    }
+
+def ingredient_body(rng: random.Random, index: int):
+    return {
+        'name': f'Ingredient {index}', 'type': rng.choice(['fruit', 'syrup', 'bitters']),
+        'category': rng.choice(['garnish', 'mixer']), 'price': round(rng.uniform(1, 10), 2),
+        'unit': rng.choice(['kg', 'l', 'each']), 'shop': rng.choice(SHOPS)
+    }
+
+def cocktail_body(rng: random.Random, index: int, component_ids):
+    return {
+        'name': f'Cocktail {index}', 'description': None,
+        'ingredients': [
+            {'ingredient_id': component_id, 'ingredient_name': component_id, 'amount': 30,
+             'unit': 'ml', 'cost': round(rng.uniform(0.2, 4.0), 2)}
+            for component_id in rng.sample(component_ids, min(len(component_ids), rng.randint(3, 6)))
+        ],
+        'instructions': ['Shake', 'Strain'], 'profit_margin': rng.choice([150, 200, 300]),
+        'servings': 1, 'category': 'classic', 'tags': [], 'image_url': None
+    }
+
+def seed_user(db, user_id: str, size: int, product_base_url: str, tracked: int):
+    """Write size alcohol items, ingredients and cocktails for a user straight into the store
+
+    Documents match what the routes store, including the ingredient usage
+    index and a year of price history for the first item.
+    """
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    writer = BatchWriter(db)
+    alcohol_ids, ingredient_ids = [], []
+
+    for index in range(size):
+        url = f'{product_base_url}/{"bws.com.au" if index % 2 else "liquorland.com.au"}/product/{index}' \
+            if index < tracked else None
+        body = alcohol_body(rng, index, url)
+        item_id = f'{user_id}-item-{index}'
+        alcohol_ids.append(item_id)
+        writer.set(item_id, db.collection('alcohol_items').document(item_id), {
+            'id': item_id, 'userId': user_id, 'name': body['name'], 'brand': body['brand'],
+            'type': body['type'], 'size': body['size'], 'alcoholPercentage': body['alcohol_percentage'],
+            'price': body['price'], 'pricePerLiter': body['price'] / body['size'] * 1000,
+            'shop': body['shop'], 'productUrl': url, 'imageUrl': None, 'lastUpdated': now
+        })
+
+        body = ingredient_body(rng, index)
+        ingredient_id = f'{user_id}-ingredient-{index}'
+        ingredient_ids.append(ingredient_id)
+        writer.set(ingredient_id, db.collection('ingredients').document(ingredient_id), {
+            'id': ingredient_id, 'userId': user_id, 'name': body['name'], 'type': body['type'],
+            'category': body['category'], 'price': body['price'], 'unit': body['unit'],
+            'pricePerUnit': body['price'], 'shop': body['shop'], 'lastUpdated': now
+        })
+
+    usage = {}
+    component_ids = alcohol_ids + ingredient_ids
+    for index in range(size):
+        body = cocktail_body(rng, index, component_ids)
+        cocktail_id = f'{user_id}-cocktail-{index}'
+        total = sum(ingredient['cost'] for ingredient in body['ingredients'])
+        writer.set(cocktail_id, db.collection('cocktails').document(cocktail_id), {
+            'id': cocktail_id, 'userId': user_id, 'name': body['name'], 'description': None,
+            'ingredients': body['ingredients'], 'instructions': body['instructions'], 'totalCost': total,
+            'profitMargin': body['profit_margin'], 'sellingPrice': total * (1 + body['profit_margin'] / 100),
+            'servings': 1, 'costPerServing': total, 'category': 'classic', 'tags': [], 'imageUrl': None,
+            'createdAt': now, 'updatedAt': now
+        })
+        for ingredient in body['ingredients']:
+            usage.setdefault(ingredient['ingredient_id'], []).append(cocktail_id)
+
+    for component_id, cocktail_ids in usage.items():
+        writer.set(component_id, db.collection('ingredient_usage').document(f'{user_id}_{component_id}'), {
+            'userId': user_id, 'cocktailIds': cocktail_ids
+        })
+    for day in range(365):
+        append_price(writer, 'history', db, alcohol_ids[0], user_id, round(rng.uniform(40, 60), 2),
+                     now - timedelta(days=day))
+    writer.commit()
+    return alcohol_ids, ingredient_ids
+
+def summarize(latencies, elapsed: float):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+
+class Suite:
+    def __init__(self, client: TestClient, iterations: int, only):
+        self.client = client
+        self.iterations = iterations
+        self.only = only
+        self.results = {}
+
+    def run(self, name: str, call, setup=None, iterations=None):
+        """Time call(setup()) repeatedly, then measure its peak memory with tracemalloc"""
+        if self.only and not any(part in name for part in self.only):
+            return
+        iterations = iterations or self.iterations
+
+        # One untimed call first, so caches and lazy imports are warm
+        call(setup() if setup else None)
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            argument = setup() if setup else None
+            before = time.perf_counter()
+            response = call(argument)
+            latencies.append((time.perf_counter() - before) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'{name}: HTTP {response.status_code} {response.text[:200]}')
+        # With per-call setup, throughput counts only the timed calls
+        elapsed = sum(latencies) / 1000 if setup else time.perf_counter() - started
+
+        tracemalloc.start()
+        for _ in range(min(iterations, MEMORY_PASS_ITERATIONS)):
+            argument = setup() if setup else None
+            tracemalloc.reset_peak()
+            call(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = summarize(latencies, elapsed)
+        result['peak_kib'] = round(peak / 1024, 1)
+        self.results[name] = result
+        print(f'  {name:42s} {result["p50_ms"]:9.2f} {result["p95_ms"]:9.2f} {result["p99_ms"]:9.2f}'
+              f' {result["throughput_per_s"]:9.1f} {result["peak_kib"]:10.1f}', flush=True)
+
+def bench_auth(suite: Suite):
+    client = suite.client
+    counter = iter(range(10 ** 9))
+    suite.run('auth register', lambda _: client.post('/auth/register', json={
+        'email': f'bench-{next(counter)}@example.com', 'password': 'hunter2',
+        'first_name': 'Bench', 'last_name': 'User'
+    }))
+    client.post('/auth/register', json={
+        'email': 'login@example.com', 'password': 'hunter2', 'first_name': 'Bench', 'last_name': 'User'
+    })
+    suite.run('auth login', lambda _: client.post('/auth/login', json={
+        'email': 'login@example.com', 'password': 'hunter2'
+    }))
+
+def bench_routes(suite: Suite, size: int, user_id: str, alcohol_ids, ingredient_ids):
+    client = suite.client
+    params = {'user_id': user_id}
+    rng = random.Random(size)
+    counter = iter(range(10 ** 9))
+    prefix = f'n={size:<6}'
+
+    def invalidate(collection):
+        # Uncached listings: drop the cached copy before each request
+        return lambda: list_cache.invalidate(collection, user_id)
+
+    def created(path, body):
+        return lambda: client.post(path, params=params, json=body(rng, next(counter))).json()['id']
+
+    for collection, path, body in (('alcohol_items', '/alcohol/', alcohol_body),
+                                   ('ingredients', '/ingredients/', ingredient_body)):
+        name = path.strip('/')
+        ids = alcohol_ids if name == 'alcohol' else ingredient_ids
+        suite.run(f'{name} list cached {prefix}', lambda _, path=path: client.get(path, params=params))
+        suite.run(f'{name} list uncached {prefix}', lambda _, path=path: client.get(path, params=params),
+                  setup=invalidate(collection))
+        suite.run(f'{name} list page {prefix}',
+                  lambda _, path=path: client.get(path, params={**params, 'limit': 100}))
+        suite.run(f'{name} list fields {prefix}',
+                  lambda _, path=path: client.get(path, params={**params, 'fields': 'name,price'}))
+        suite.run(f'{name} list ndjson {prefix}',
+                  lambda _, path=path: client.get(path, params={**params, 'format': 'ndjson'}))
+        suite.run(f'{name} create {prefix}',
+                  lambda _, path=path, body=body: client.post(path, params=params, json=body(rng, next(counter))))
+        suite.run(f'{name} update {prefix}', lambda _, path=path, body=body, ids=ids: client.put(
+            f'{path}{rng.choice(ids)}', params=params, json=body(rng, next(counter))))
+        suite.run(f'{name} delete {prefix}', lambda item_id, path=path: client.delete(f'{path}{item_id}', params=params),
+                  setup=created(path, body))
+
+    suite.run(f'alcohol price-history {prefix}', lambda _: client.get(
+        f'/alcohol/{alcohol_ids[0]}/price-history', params={**params, 'bucket': 'week'}))
+    suite.run(f'alcohol cheapest {prefix}', lambda _: client.get(
+        '/alcohol/cheapest', params={**params, 'by': 'price_per_standard_drink', 'k': 10, 'type': 'gin'}))
+
+    component_ids = alcohol_ids + ingredient_ids
+    suite.run(f'cocktails list cached {prefix}', lambda _: client.get('/cocktails/', params=params))
+    suite.run(f'cocktails list uncached {prefix}', lambda _: client.get('/cocktails/', params=params),
+              setup=invalidate('cocktails'))
+    suite.run(f'cocktails list page {prefix}', lambda _: client.get('/cocktails/', params={**params, 'limit': 100}))
+    suite.run(f'cocktails create {prefix}', lambda _: client.post(
+        '/cocktails/', params=params, json=cocktail_body(rng, next(counter), component_ids)))
+    cocktail_ids = [client.post('/cocktails/', params=params, json=cocktail_body(rng, index, component_ids)).json()['id']
+                    for index in range(5)]
+    suite.run(f'cocktails update {prefix}', lambda _: client.put(
+        f'/cocktails/{rng.choice(cocktail_ids)}', params=params, json=cocktail_body(rng, next(counter), component_ids)))
+    suite.run(f'cocktails delete {prefix}', lambda cocktail_id: client.delete(f'/cocktails/{cocktail_id}', params=params),
+              setup=lambda: client.post('/cocktails/', params=params,
+                                        json=cocktail_body(rng, next(counter), component_ids)).json()['id'])
+    suite.run(f'cocktails what-if {prefix}', lambda _: client.post('/cocktails/what-if', params=params, json={
+        'ingredient_changes': {ingredient_ids[0]: 10}, 'type_changes': {'gin': 5}}))
+    suite.run(f'cocktails usage-rebuild {prefix}', lambda _: client.post(
+        '/cocktails/ingredient-usage/rebuild', params=params), iterations=max(3, suite.iterations // 10))
+
+def bench_scraper(suite: Suite, size: int, user_id: str, base_url: str, tracked: int):
+    client = suite.client
+    prefix = f'n={size:<6}'
+    # URLs unique to this size, so "cold" never hits pages cached by a previous size
+    urls = [f'{base_url}/bws.com.au/product/{size}-{index}' for index in range(suite.iterations + 1)]
+    fresh = iter(urls)
+    suite.run(f'scraper scrape cold {prefix}', lambda url: client.post('/scraper/scrape', json={'product_url': url}),
+              setup=lambda: next(fresh, urls[0]))
+    suite.run(f'scraper scrape warm {prefix}', lambda _: client.post(
+        '/scraper/scrape', json={'product_url': urls[0]}))
+    if tracked:
+        suite.run(f'scraper update-prices tracked={tracked} {prefix}', lambda _: client.post(
+            '/scraper/update-prices', params={'user_id': user_id}), iterations=max(3, suite.iterations // 10))
+
+def compare(results, baseline, tolerance: float) -> int:
+    """Print each scenario's change against the baseline; return the number of regressions"""
+    regressions = 0
+    print(f'\n  {"scenario":42s} {"p50":>9s} {"p95":>9s} {"peak":>9s}')
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        changes = {
+            key: (result[key] - before[key]) / before[key] if before[key] else 0.0
+            for key in ('p50_ms', 'p95_ms', 'peak_kib')
+        }
+        regressed = changes['p50_ms'] > tolerance or changes['p95_ms'] > tolerance
+        regressions += regressed
+        print(f'  {name:42s} {changes["p50_ms"]:+9.1%} {changes["p95_ms"]:+9.1%} {changes["peak_kib"]:+9.1%}'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000',
+                        help='comma-separated items per user')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--tracked', type=int, default=50,
+                        help='items per user with a product URL, refreshed by update-prices')
+    parser.add_argument('--only', help='comma-separated scenario name filters, e.g. alcohol,scraper')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results written earlier with --output')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative p50/p95 growth that counts as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = args.only.split(',') if args.only else None
+
+    print(f'  {"scenario":42s} {"p50 ms":>9s} {"p95 ms":>9s} {"p99 ms":>9s} {"ops/s":>9s} {"peak KiB":>10s}')
+    with FixtureServer() as server, TestClient(app) as client:
+        suite = Suite(client, args.iterations, only)
+        bench_auth(suite)
+        for size in sizes:
+            # A fresh store per size, so smaller users are not measured against larger collections
+            firebase_utils.get_memory_client.client = MemoryClient()
+            user_id = f'bench-user-{size}'
+            tracked = min(size, args.tracked)
+            alcohol_ids, ingredient_ids = seed_user(
+                firebase_utils.get_firestore_client(), user_id, size, server.base_url, tracked
+            )
+            bench_routes(suite, size, user_id, alcohol_ids, ingredient_ids)
+            bench_scraper(suite, size, user_id, server.base_url, tracked)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'iterations': args.iterations,
+                       'results': suite.results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(suite.results, baseline, args.tolerance)
+        print(f'\n  {regressions} regression(s) beyond {args.tolerance:.0%}')
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
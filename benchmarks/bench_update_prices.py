@@ -0,0 +1,93 @@
+"""Benchmark the price refresh scrape pipeline against the local fixture server.
+
+Usage (from the repository root):
+    python benchmarks/bench_update_prices.py --items 400 --latency 0.05
+
+Compares scraping every URL one at a time (the old refresh loop) with the
+concurrent, pooled pipeline used by /scraper/update-prices, cold and with a
+warm page cache (every page answered with 304 Not Modified), and with
+listing mode, which prices items from category pages of --page-size tiles.
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+import utils.page_cache  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from scraper import ScrapeRequest, scrape_from_listings, scrape_many, scrape_product  # noqa: E402
+from utils.http_client import close_clients  # noqa: E402
+from utils.page_cache import PageCache  # noqa: E402
+
+def build_urls(base_url: str, count: int):
+    """Build distinct product URLs alternating between the two retailers"""
+    retailers = ['bws.com.au', 'liquorland.com.au']
+    return [f'{base_url}/{retailers[i % 2]}/product/{i}' for i in range(count)]
+
+def build_listing_urls(base_url: str, count: int, page_size: int):
+    """Build the category pages whose tiles cover the first count products"""
+    return [
+        f'{base_url}/{retailer}/listing?start={start}&count={page_size}'
+        for retailer in ['bws.com.au', 'liquorland.com.au']
+        for start in range(0, count, page_size)
+    ]
+
+async def run_sequential(urls):
+    for url in urls:
+        result = await scrape_product(ScrapeRequest(product_url=url))
+        if not result.success:
+            raise RuntimeError(result.error)
+    await close_clients()
+
+async def run_concurrent(urls):
+    results = await scrape_many(urls)
+    failed = [result.error for result in results.values() if not result.success]
+    if failed:
+        raise RuntimeError(failed[0])
+    await close_clients()
+
+async def run_listing(urls, listing_urls):
+    results, matched, errors = await scrape_from_listings(urls, listing_urls, fallback=True)
+    failed = errors + [result.error for result in results.values() if not result.success]
+    if failed:
+        raise RuntimeError(failed[0])
+    if matched != len(urls):
+        raise RuntimeError(f'only {matched} of {len(urls)} items found on listing pages')
+    await close_clients()
+
+def timed(label: str, coro, count: int, server: FixtureServer, cache_dir=None):
+    utils.page_cache.page_cache = PageCache(cache_dir or tempfile.mkdtemp())
+    requests_before = sum(server.faults.counts.values())
+    started = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - started
+    requests = sum(server.faults.counts.values()) - requests_before
+    print(f'{label:<12} {count:>6} items  {elapsed:8.3f}s  {count / elapsed:9.1f} items/sec  {requests:>6} requests')
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='simulated retailer response time in seconds')
+    parser.add_argument('--page-size', type=int, default=48, help='product tiles per listing page')
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    with FixtureServer(latency=args.latency) as server:
+        urls = build_urls(server.base_url, args.items)
+        cache_dir = tempfile.mkdtemp()
+        concurrent = timed('concurrent', run_concurrent(urls), len(urls), server, cache_dir)
+        timed('warm cache', run_concurrent(urls), len(urls), server, cache_dir)
+        listing_urls = build_listing_urls(server.base_url, len(urls), args.page_size)
+        timed('listing', run_listing(urls, listing_urls), len(urls), server)
+        if not args.skip_sequential:
+            sequential = timed('sequential', run_sequential(urls), len(urls), server)
+            print(f'speedup      {sequential / concurrent:.1f}x')
+
+if __name__ == '__main__':
+    main()
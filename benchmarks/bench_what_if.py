@@ -0,0 +1,78 @@
+"""Benchmark the menu-wide what-if pricing engine on a synthetic menu.
+
+Usage (from the repository root):
+    python benchmarks/bench_what_if.py --cocktails 5000 --ingredients 400
+
+Compares recalculating each cocktail with calculate_cocktail_costs against
+one vectorized MenuMatrix.evaluate pass.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from cocktails import CocktailIngredient, calculate_cocktail_costs  # noqa: E402
+from utils.menu_pricing import MenuMatrix  # noqa: E402
+
+def build_menu(cocktails: int, ingredients: int, seed: int = 7):
+    """Synthetic cocktails with 3-8 ingredients each"""
+    rng = random.Random(seed)
+    ingredient_ids = [f'ingredient-{i}' for i in range(ingredients)]
+    docs = []
+    for i in range(cocktails):
+        docs.append((f'cocktail-{i}', {
+            'name': f'Cocktail {i}',
+            'profitMargin': rng.choice([150, 200, 250, 300]),
+            'servings': rng.choice([1, 1, 1, 2]),
+            'ingredients': [
+                {'ingredient_id': ingredient_id, 'ingredient_name': ingredient_id, 'amount': 30,
+                 'unit': 'ml', 'cost': round(rng.uniform(0.1, 4.0), 2)}
+                for ingredient_id in rng.sample(ingredient_ids, rng.randint(3, 8))
+            ]
+        }))
+    return docs, ingredient_ids
+
+def per_cocktail(docs, changes):
+    results = []
+    for _, data in docs:
+        ingredients = [CocktailIngredient(**ingredient) for ingredient in data['ingredients']]
+        for ingredient in ingredients:
+            if ingredient.ingredient_id in changes:
+                ingredient.cost *= 1 + changes[ingredient.ingredient_id] / 100
+        results.append(calculate_cocktail_costs(ingredients, data['profitMargin'], data['servings']))
+    return results
+
+def best_of(repeat: int, fn):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cocktails', type=int, default=5000)
+    parser.add_argument('--ingredients', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    docs, ingredient_ids = build_menu(args.cocktails, args.ingredients)
+    changes = {ingredient_id: 12.0 for ingredient_id in ingredient_ids[:20]}
+
+    build_ms, menu = best_of(args.repeat, lambda: MenuMatrix(docs))
+    evaluate_ms, scenario = best_of(args.repeat, lambda: menu.evaluate(menu.multipliers(changes)))
+    loop_ms, expected = best_of(args.repeat, lambda: per_cocktail(docs, changes))
+
+    drift = max(abs(a['total_cost'] - b) for a, b in zip(expected, scenario['total_cost']))
+    print(f'{args.cocktails} cocktails x {args.ingredients} ingredients')
+    print(f'  per-cocktail loop  {loop_ms:9.2f} ms')
+    print(f'  matrix build       {build_ms:9.2f} ms (once per menu change)')
+    print(f'  vectorized pass    {evaluate_ms:9.2f} ms')
+    print(f'  max difference     {drift:.2e}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Local HTTP server that serves the recorded retailer pages in fixtures/.
+
+Any path containing "liquorland" gets the Liquorland page, everything else the
+BWS page, so benchmark URLs such as http://127.0.0.1:<port>/bws.com.au/product/1
+route through the scraper's retailer detection unchanged. Paths containing
+"listing" get a category page of product tiles linking to those product URLs,
+e.g. /bws.com.au/listing?start=0&count=48 for products 0-47.
+
+Faults can be injected to exercise the scraper's retries, throttling and
+circuit breaker: a share of requests can be answered with 429 (throttle),
+503 (error), served slowly (slow, sleeping slow_seconds) or have their
+connection dropped (drop), and down=True fails every request with a 500.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+def load_fixture(name: str) -> bytes:
+    """Read a recorded page from the fixtures directory"""
+    return (FIXTURES_DIR / name).read_bytes()
+
+def listing_page(retailer: str, start: int, count: int) -> bytes:
+    """A category page with tiles for products start..start+count-1
+
+    Liquorland-style pages also carry the tiles as a schema.org ItemList.
+    """
+    tiles = []
+    items = []
+    for index in range(start, start + count):
+        url = f'/{retailer}/product/{index}'
+        name = f'Fixture Gin {index} 700mL'
+        price = f'{40 + index % 50}.99'
+        tiles.append(
+            f'<div class="product-tile"><a class="product-tile__link" href="{url}?utm_source=listing">'
+            f'<img src="/images/product/{index}.jpg" alt=""><h3 class="product-tile__title">{name}</h3></a>'
+            f'<div class="product-tile__price"><span class="price">${price}</span></div></div>'
+        )
+        items.append({
+            '@type': 'ListItem', 'position': index - start + 1,
+            'item': {'@type': 'Product', 'name': name, 'url': url,
+                     'offers': {'@type': 'Offer', 'price': price, 'priceCurrency': 'AUD'}}
+        })
+    structured = ''
+    if 'liquorland' in retailer:
+        item_list = {'@context': 'https://schema.org', '@type': 'ItemList', 'itemListElement': items}
+        structured = f'<script type="application/ld+json">{json.dumps(item_list)}</script>'
+    return (
+        f'<!DOCTYPE html><html><head><title>Gin | {retailer}</title>{structured}</head>'
+        f'<body><h1>Gin</h1><div class="product-grid">{"".join(tiles)}</div></body></html>'
+    ).encode()
+
+class Faults:
+    """Fault rates for a fixture server, changeable while it runs"""
+
+    def __init__(self, throttle: float = 0.0, error: float = 0.0, slow: float = 0.0,
+                 drop: float = 0.0, slow_seconds: float = 2.0, down: bool = False, seed: int = 7):
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.counts = {'ok': 0, 'throttle': 0, 'error': 0, 'slow': 0, 'drop': 0, 'down': 0}
+        self.set(throttle=throttle, error=error, slow=slow, drop=drop, slow_seconds=slow_seconds, down=down)
+
+    def set(self, **rates):
+        with self.lock:
+            for name, value in rates.items():
+                setattr(self, name, value)
+
+    def pick(self) -> str:
+        """Choose what happens to the next request, and count it"""
+        with self.lock:
+            if self.down:
+                outcome = 'down'
+            else:
+                roll = self.rng.random()
+                outcome = 'ok'
+                for name in ('throttle', 'error', 'drop', 'slow'):
+                    rate = getattr(self, name)
+                    if roll < rate:
+                        outcome = name
+                        break
+                    roll -= rate
+            self.counts[outcome] += 1
+            return outcome
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    pages = {}
+    faults = None
+
+    def send_status(self, status: int, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+        outcome = self.faults.pick()
+        if outcome == 'throttle':
+            return self.send_status(429, [('Retry-After', '1')])
+        if outcome == 'error':
+            return self.send_status(503)
+        if outcome == 'down':
+            return self.send_status(500)
+        if outcome == 'drop':
+            self.close_connection = True
+            return
+        if outcome == 'slow':
+            time.sleep(self.faults.slow_seconds)
+
+        retailer = 'liquorland' if 'liquorland' in self.path else 'bws'
+        if 'listing' in self.path:
+            query = parse_qs(urlsplit(self.path).query)
+            start = int(query.get('start', ['0'])[0])
+            count = int(query.get('count', ['48'])[0])
+            body = listing_page(f'{retailer}.com.au', start, count)
+        else:
+            body = self.pages[retailer]
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """Serve fixture pages from a background thread on an ephemeral port, with optional Faults"""
+
+    def __init__(self, latency: float = 0.0, **faults):
+        self.faults = Faults(**faults)
+        handler = type('Handler', (FixtureHandler,), {
+            'latency': latency,
+            'faults': self.faults,
+            'pages': {
+                'bws': load_fixture('bws_product.html'),
+                'liquorland': load_fixture('liquorland_product.html'),
+            },
+        })
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
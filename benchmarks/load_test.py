@@ -0,0 +1,153 @@
+"""Concurrency load test for the API's datastore-backed routes.
+
+Usage (from the repository root):
+    python benchmarks/load_test.py --clients 64 --duration 20
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmarks/load_test.py --clients 64
+
+Starts the API under uvicorn (or targets --url), seeds alcohol items for a
+few users, then runs --clients concurrent clients issuing a mix of cached
+listings, paged listings, reads-then-updates and creates for --duration
+seconds. Reports p50/p95/p99 latency per operation and overall throughput.
+
+Without the emulator the in-memory store is used, with every datastore
+call blocking for --latency-ms to stand in for a network round trip.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).resolve().parents[1] / 'api'
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, latency_ms: float) -> subprocess.Popen:
+    env = dict(os.environ, JOB_WORKERS='0', MEMORY_STORE_LATENCY_MS=str(latency_ms))
+    if not env.get('FIRESTORE_EMULATOR_HOST'):
+        env.setdefault('STORAGE_BACKEND', 'memory')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=API_DIR, env=env
+    )
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get('/')).status_code == 200:
+                return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+def item_body(rng: random.Random, index: int):
+    return {
+        'name': f'Item {index}', 'brand': rng.choice(['Brand A', 'Brand B', 'Brand C']),
+        'type': rng.choice(['gin', 'vodka', 'rum', 'whisky']), 'size': rng.choice([700, 1000]),
+        'alcohol_percentage': 40.0, 'price': round(rng.uniform(30, 90), 2), 'shop': 'bws'
+    }
+
+async def seed(client: httpx.AsyncClient, users: int, items: int):
+    """Create items for each user, returning {user_id: [item ids]}"""
+    rng = random.Random(11)
+    seeded = {}
+    for user in range(users):
+        user_id = f'load-user-{user}'
+        responses = await asyncio.gather(*(
+            client.post('/alcohol/', params={'user_id': user_id}, json=item_body(rng, index))
+            for index in range(items)
+        ))
+        seeded[user_id] = [response.json()['id'] for response in responses]
+    return seeded
+
+async def run_client(client: httpx.AsyncClient, seeded, deadline: float, samples, seed_value: int):
+    rng = random.Random(seed_value)
+    user_ids = list(seeded)
+    while time.monotonic() < deadline:
+        user_id = rng.choice(user_ids)
+        params = {'user_id': user_id}
+        operation = rng.choices(['list', 'page', 'update', 'create'], weights=[4, 3, 2, 1])[0]
+        started = time.perf_counter()
+        if operation == 'list':
+            response = await client.get('/alcohol/', params=params)
+        elif operation == 'page':
+            response = await client.get('/alcohol/', params={**params, 'limit': 25})
+        elif operation == 'update':
+            item_id = rng.choice(seeded[user_id])
+            response = await client.put(f'/alcohol/{item_id}', params=params, json=item_body(rng, 0))
+        else:
+            response = await client.post('/ingredients/', params=params, json={
+                'name': 'Lime', 'type': 'fruit', 'category': 'garnish', 'price': 1.2,
+                'unit': 'each', 'shop': 'market'
+            })
+        elapsed = (time.perf_counter() - started) * 1000
+        samples.setdefault(operation, []).append(elapsed)
+        if response.status_code != 200:
+            samples.setdefault('errors', []).append(response.status_code)
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': statistics.median(values), 'p95': cuts[94], 'p99': cuts[98]}
+
+async def run(args):
+    port = None
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        server = start_server(port, args.latency_ms)
+        base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await wait_until_up(client)
+            seeded = await seed(client, args.users, args.items)
+
+            samples = {}
+            started = time.monotonic()
+            deadline = started + args.duration
+            await asyncio.gather(*(
+                run_client(client, seeded, deadline, samples, index) for index in range(args.clients)
+            ))
+            elapsed = time.monotonic() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    errors = samples.pop('errors', [])
+    everything = [value for values in samples.values() for value in values]
+    print(f'{args.clients} clients for {args.duration}s against {base_url} '
+          f'({args.users} users x {args.items} items, {args.latency_ms} ms simulated datastore latency)')
+    print(f'  {"operation":10s} {"count":>7s} {"p50 ms":>9s} {"p95 ms":>9s} {"p99 ms":>9s}')
+    for operation, values in sorted(samples.items()) + [('all', everything)]:
+        stats = percentiles(values)
+        print(f'  {operation:10s} {len(values):7d} {stats["p50"]:9.2f} {stats["p95"]:9.2f} {stats["p99"]:9.2f}')
+    print(f'  throughput {len(everything) / elapsed:.1f} requests/s, {len(errors)} errors')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()